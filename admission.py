@@ -0,0 +1,43 @@
+import time
+import random
+import threading
+from typing import Hashable, Optional, Set
+
+DEFAULT_RATE = 50.0
+DEFAULT_BURST = 10
+HINT_SPREAD = 0.5
+
+
+class AdmissionControl:
+    def __init__(self, rate: float = DEFAULT_RATE, burst: int = DEFAULT_BURST):
+        self.rate = rate
+        self.burst = burst
+        self.tokens = float(burst)
+        self.updated = time.monotonic()
+        self.deferred: Set[Hashable] = set()
+        self.lock = threading.Lock()
+        self.admitted = 0
+        self.rejected = 0
+
+    def try_admit(self, key: Hashable) -> Optional[float]:
+        with self.lock:
+            now = time.monotonic()
+            self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+            self.updated = now
+
+            if self.tokens >= 1:
+                self.tokens -= 1
+                self.deferred.discard(key)
+                self.admitted += 1
+                return None
+
+            self.deferred.add(key)
+            self.rejected += 1
+            # Quem já está na fila espalha as novas tentativas pelo tempo que a fila leva para escoar
+            backlog = len(self.deferred) / self.rate
+            wait = max((1 - self.tokens) / self.rate, backlog)
+            return wait * random.uniform(1, 1 + HINT_SPREAD)
+
+    def stats(self) -> dict:
+        with self.lock:
+            return {"admitted": self.admitted, "rejected": self.rejected, "deferred": len(self.deferred)}
@@ -0,0 +1,169 @@
+import asyncio
+import functools
+import threading
+import concurrent.futures
+from typing import Callable, Dict, List, Set
+
+from peer import Peer, ElectionTally, _drop_finished, ELECTION_VOTE_TIMEOUT, HEARTBEAT_INTERVAL, HEARTBEAT_ROUND_DEADLINE
+from scheduler import AsyncioScheduler
+
+ASYNC_IO_WORKERS = 32
+
+
+class AsyncPeer(Peer):
+    def __init__(self, peer_id: int, files_path: str = None, io_workers: int = ASYNC_IO_WORKERS):
+        super().__init__(peer_id, files_path)
+        self.io_workers = io_workers
+        self.io_executor = None
+        self.loop = None
+        self.watched_sockets: Set = set()
+
+    def _offload(self, function: Callable, *args) -> asyncio.Future:
+        # Pyro é bloqueante: as chamadas remotas ocupam um pool fixo, o leque de espera fica no loop
+        return self.loop.run_in_executor(self.io_executor, functools.partial(function, *args))
+
+    async def start_async(self) -> bool:
+        self.loop = asyncio.get_running_loop()
+        self.io_executor = concurrent.futures.ThreadPoolExecutor(
+            max_workers=self.io_workers, thread_name_prefix=f"Peer-{self.peer_id}-io"
+        )
+        self.scheduler = AsyncioScheduler(self.loop, self.io_executor)
+
+        try:
+            daemon = await self._offload(self._start_services)
+            self._watch_daemon_sockets(daemon)
+            await self._offload(self.find_and_register_with_tracker)
+            return True
+        except Exception as e:
+            self.logger.error(f"Erro ao iniciar peer: {e}")
+            return False
+
+    async def stop_async(self):
+        self.stopped = True
+        self._unwatch_daemon_sockets()
+        await self._offload(self.stop)
+        self.io_executor.shutdown(wait=False, cancel_futures=True)
+
+    def _watch_daemon_sockets(self, daemon):
+        current = set(daemon.sockets)
+        for sock in self.watched_sockets - current:
+            self.loop.remove_reader(sock)
+        for sock in current - self.watched_sockets:
+            self.loop.add_reader(sock, self._on_daemon_event, daemon, sock)
+        self.watched_sockets = current
+
+    def _unwatch_daemon_sockets(self):
+        for sock in self.watched_sockets:
+            self.loop.remove_reader(sock)
+        self.watched_sockets = set()
+
+    def _on_daemon_event(self, daemon, sock):
+        if self.stopped:
+            return
+        try:
+            daemon.events([sock])
+        except Exception as e:
+            self.logger.warning(f"Erro ao atender requisição Pyro: {e}")
+        # Conexões novas e encerradas mudam o conjunto de sockets do daemon
+        self._watch_daemon_sockets(daemon)
+
+    async def _begin_election(self, new_epoch: int):
+        if self._claim_candidacy(new_epoch):
+            await self._run_election(new_epoch)
+
+    async def _run_election(self, new_epoch: int):
+        try:
+            peers = await self._offload(self._election_peers)
+            tally = ElectionTally(self, len(peers))
+
+            requests: Dict[asyncio.Future, int] = {}
+            for peer_id, uri in peers.items():
+                if peer_id != self.peer_id:
+                    self.logger.info(f"Solicitando voto do peer {peer_id}")
+                    vote = asyncio.wait_for(self._offload(self._request_vote_from, uri, new_epoch), ELECTION_VOTE_TIMEOUT)
+                    requests[asyncio.ensure_future(vote)] = peer_id
+
+            pending = set(requests)
+            while pending and not self._election_superseded(new_epoch) and tally.undecided(len(pending)):
+                timeout = tally.wait_timeout()
+                if timeout <= 0:
+                    tally.expire([requests[future] for future in pending])
+                    break
+                done, pending = await asyncio.wait(pending, timeout=timeout, return_when=asyncio.FIRST_COMPLETED)
+                for future in done:
+                    tally.record(requests[future], future)
+            tally.abandon(pending)
+
+            if self._election_superseded(new_epoch):
+                self.election_in_progress = False
+                return
+
+            if self._election_won(tally.total_peers):
+                await self._offload(self._become_tracker, new_epoch, tally.unreachable)
+
+        except Exception as e:
+            self._election_failed(e)
+
+    def _start_heartbeat_task(self, epoch: int):
+        self._reset_heartbeat_rounds()
+        in_flight: Dict[int, asyncio.Future] = {}
+
+        async def send_heartbeats():
+            if not self._heartbeat_round_active(epoch):
+                self.scheduler.cancel(task)
+                for future in in_flight.values():
+                    future.cancel()
+                return
+
+            if self._members_stale():
+                await self._offload(self._refresh_members)
+
+            for peer_id, uri in self._heartbeat_targets(in_flight).items():
+                # _send_heartbeat registra o resultado (a conexão já tem o timeout do heartbeat); o envio segue
+                # em andamento até terminar, então cada heartbeat conta uma única vez
+                in_flight[peer_id] = self._offload(self._send_heartbeat, peer_id, uri, epoch)
+
+            # Peers lentos não seguram a rodada: continuam em andamento e são pulados até responderem
+            if in_flight:
+                await asyncio.wait(list(in_flight.values()), timeout=HEARTBEAT_ROUND_DEADLINE)
+            _drop_finished(in_flight)
+
+        task = self.scheduler.call_every(HEARTBEAT_INTERVAL, send_heartbeats, first_delay=0)
+        self.heartbeat_task = task
+
+    async def register(self) -> bool:
+        return await self._offload(self._register_files_with_tracker)
+
+    async def search(self, filename: str) -> List[int]:
+        return await self._offload(self.search_file_from_tracker, filename)
+
+    async def query(self, pattern: str, mode: str = "exact", offset: int = 0, limit: int = 100) -> Dict:
+        return await self._offload(self.query_files_from_tracker, pattern, mode, offset, limit)
+
+    async def locate(self, filename: str) -> Dict:
+        return await self._offload(self.locate_file_from_tracker, filename)
+
+    async def download(self, filename: str, peer_ids: List[int] = None, timeout: float = None) -> bool:
+        # Cancelar o future não para a thread do executor: o evento encerra os workers do enxame entre pedaços
+        cancel = threading.Event()
+        future = self._offload(self.download_file_swarm, filename, peer_ids, cancel)
+        try:
+            return await asyncio.wait_for(asyncio.shield(future), timeout)
+        except asyncio.TimeoutError:
+            cancel.set()
+            # Só devolve o erro depois que os workers soltaram o arquivo parcial
+            await future
+            raise
+        except asyncio.CancelledError:
+            cancel.set()
+            raise
+
+    async def add(self, filename: str, content: bytes) -> bool:
+        return await self._offload(self.add_file, filename, content)
+
+    async def remove(self, filename: str) -> bool:
+        return await self._offload(self.remove_file, filename)
+
+    async def stats(self) -> Dict:
+        return await self._offload(self.get_stats)
+
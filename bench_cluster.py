@@ -0,0 +1,470 @@
+import os
+import sys
+import json
+import time
+import random
+import shutil
+import signal
+import logging
+import argparse
+import platform
+import collections
+import tempfile
+import threading
+import subprocess
+import Pyro5.api
+import Pyro5.core
+import Pyro5.errors
+import Pyro5.callcontext
+import Pyro5.nameserver
+
+from control import CONTROL_PREFIX
+from peer import TRACKER_PREFIX, SERIALIZER
+
+MAIN = os.path.join(os.path.dirname(os.path.abspath(__file__)), "main.py")
+POLL_INTERVAL = 0.01
+
+
+def percentiles(samples, points=(50, 90, 99)) -> dict:
+    if not samples:
+        return {}
+    ordered = sorted(samples)
+    result = {f"p{p}": ordered[int(round(p / 100 * (len(ordered) - 1)))] for p in points}
+    result["max"] = ordered[-1]
+    result["mean"] = sum(ordered) / len(ordered)
+    return result
+
+
+def wait_until(condition, timeout: float, interval: float = POLL_INTERVAL):
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        value = condition()
+        if value:
+            return value
+        time.sleep(interval)
+    return None
+
+
+def version() -> str:
+    try:
+        return subprocess.run(["git", "describe", "--always", "--dirty"], cwd=os.path.dirname(MAIN),
+                              capture_output=True, text=True, timeout=5).stdout.strip() or None
+    except (OSError, subprocess.SubprocessError):
+        return None
+
+
+@Pyro5.api.expose
+class CountingNameServer(Pyro5.nameserver.NameServer):
+    # Só chamadas remotas contam: a carga medida é a dos peers, não a do próprio benchmark consultando o objeto
+    def __init__(self, storage):
+        super().__init__(storage)
+        self.calls = collections.Counter()
+        self.calls_lock = threading.Lock()
+
+    def _count(self, method: str):
+        if Pyro5.callcontext.current_context.client is not None:
+            with self.calls_lock:
+                self.calls[method] += 1
+
+    def _snapshot(self) -> collections.Counter:
+        with self.calls_lock:
+            return collections.Counter(self.calls)
+
+    def lookup(self, *args, **kwargs):
+        self._count("lookup")
+        return super().lookup(*args, **kwargs)
+
+    def register(self, *args, **kwargs):
+        self._count("register")
+        return super().register(*args, **kwargs)
+
+    def remove(self, *args, **kwargs):
+        self._count("remove")
+        return super().remove(*args, **kwargs)
+
+    def list(self, *args, **kwargs):
+        self._count("list")
+        return super().list(*args, **kwargs)
+
+    def set_metadata(self, *args, **kwargs):
+        self._count("set_metadata")
+        return super().set_metadata(*args, **kwargs)
+
+    def yplookup(self, *args, **kwargs):
+        self._count("yplookup")
+        return super().yplookup(*args, **kwargs)
+
+    def count(self):
+        self._count("count")
+        return super().count()
+
+    def ping(self):
+        self._count("ping")
+        return super().ping()
+
+
+class Cluster:
+    def __init__(self, work_dir: str, peers: int, ns_port: int, serializer: str):
+        self.work_dir = work_dir
+        self.peer_ids = list(range(1, peers + 1))
+        self.ns_port = ns_port
+        self.env = dict(os.environ, PYRO_NS_PORT=str(ns_port), P2P_SERIALIZER=serializer, PYTHONUNBUFFERED="1")
+        self.ns_daemon = None
+        self.nameserver = None
+        self.procs = {}
+
+    def files_dir(self, peer_id: int) -> str:
+        return os.path.join(self.work_dir, "files", f"peer_{peer_id}")
+
+    def _log(self, name: str):
+        return open(os.path.join(self.work_dir, f"{name}.log"), "w")
+
+    def start_nameserver(self):
+        # No próprio processo, para contar as requisições que os peers fazem ao serviço de nomes
+        _, self.ns_daemon, _ = Pyro5.nameserver.start_ns(host="localhost", port=self.ns_port, enableBroadcast=False)
+        self.nameserver = CountingNameServer(self.ns_daemon.nameserver.storage)
+        self.ns_daemon.unregister(Pyro5.core.NAMESERVER_NAME)
+        self.ns_daemon.register(self.nameserver, Pyro5.core.NAMESERVER_NAME)
+        self.ns_daemon.nameserver = self.nameserver
+        threading.Thread(target=self.ns_daemon.requestLoop, daemon=True, name="bench-nameserver").start()
+
+    def ns(self):
+        return self.nameserver
+
+    def ns_calls(self) -> collections.Counter:
+        return self.nameserver._snapshot()
+
+    def start_peer(self, peer_id: int):
+        self.procs[peer_id] = subprocess.Popen(
+            [sys.executable, MAIN, "peer", "--peer", str(peer_id), "--headless", "--files-dir", self.files_dir(peer_id)],
+            env=self.env, stdout=self._log(f"peer_{peer_id}"), stderr=subprocess.STDOUT,
+        )
+
+    def start_peers(self, timeout: float) -> float:
+        start = time.time()
+        # O primeiro peer forma o cluster; os demais entram depois, sem disputar a eleição inicial
+        self.start_peer(self.peer_ids[0])
+        if not wait_until(lambda: self.tracker()[1], timeout, 0.05):
+            raise RuntimeError("Nenhum tracker eleito")
+        for peer_id in self.peer_ids[1:]:
+            self.start_peer(peer_id)
+
+        names = {f"{CONTROL_PREFIX}{peer_id}" for peer_id in self.peer_ids}
+        if not wait_until(lambda: names <= set(self.ns().list(prefix=CONTROL_PREFIX)), timeout, 0.1):
+            raise RuntimeError("Nem todos os peers iniciaram")
+        return time.time() - start
+
+    def control(self, peer_id: int):
+        proxy = Pyro5.api.Proxy(self.ns().lookup(f"{CONTROL_PREFIX}{peer_id}"))
+        proxy._pyroTimeout = 60.0
+        return proxy
+
+    def tracker(self):
+        trackers = self.ns().list(prefix=TRACKER_PREFIX)
+        if not trackers:
+            return 0, None
+        epoch = max(int(name.split("_")[-1]) for name in trackers)
+        return epoch, trackers[f"{TRACKER_PREFIX}{epoch}"]
+
+    def tracker_peer(self) -> int:
+        _, uri = self.tracker()
+        for peer_id in self.alive():
+            with self.control(peer_id) as control:
+                if control.status()["uri"] == uri:
+                    return peer_id
+        return None
+
+    def alive(self):
+        return [peer_id for peer_id, proc in self.procs.items() if proc.poll() is None]
+
+    def kill(self, peer_id: int):
+        self.procs[peer_id].send_signal(signal.SIGKILL)
+        self.procs[peer_id].wait()
+
+    def stop(self):
+        for proc in self.procs.values():
+            if proc.poll() is None:
+                proc.terminate()
+        for proc in self.procs.values():
+            try:
+                proc.wait(timeout=10)
+            except subprocess.TimeoutExpired:
+                proc.kill()
+        if self.ns_daemon:
+            self.ns_daemon.shutdown()
+
+
+def build_dataset(cluster: Cluster, rng: random.Random, files_per_peer: int, download_sizes) -> dict:
+    names = []
+    for peer_id in cluster.peer_ids:
+        os.makedirs(cluster.files_dir(peer_id), exist_ok=True)
+        for n in range(files_per_peer):
+            name = f"dados_{peer_id}_{n}.txt"
+            with open(os.path.join(cluster.files_dir(peer_id), name), "wb") as f:
+                f.write(rng.randbytes(rng.randint(64, 4096)))
+            names.append(name)
+
+    # Os arquivos de download ficam só no primeiro peer para que cada rodada parta da mesma fonte
+    seeded = {}
+    for size in download_sizes:
+        name = f"download_{size}.bin"
+        with open(os.path.join(cluster.files_dir(cluster.peer_ids[0]), name), "wb") as f:
+            f.write(rng.randbytes(size))
+        seeded[size] = name
+    return {"names": names, "downloads": seeded}
+
+
+def bench_search(cluster: Cluster, names, clients: int, duration: float, seed: int) -> dict:
+    _, uri = cluster.tracker()
+    latencies, errors = [], [0]
+    lock = threading.Lock()
+    stop_at = time.time() + duration
+
+    def client(index: int):
+        rng = random.Random(seed + index)
+        local, failed = [], 0
+        with Pyro5.api.Proxy(uri) as tracker:
+            while time.time() < stop_at:
+                start = time.perf_counter()
+                try:
+                    tracker.search_file(rng.choice(names))
+                    local.append(time.perf_counter() - start)
+                except Pyro5.errors.PyroError:
+                    failed += 1
+        with lock:
+            latencies.extend(local)
+            errors[0] += failed
+
+    threads = [threading.Thread(target=client, args=(i,)) for i in range(clients)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    return {
+        "clients": clients,
+        "requests": len(latencies),
+        "errors": errors[0],
+        "requests_per_s": len(latencies) / duration,
+        "latency_ms": {key: value * 1000 for key, value in percentiles(latencies).items()},
+    }
+
+
+def bench_download(cluster: Cluster, downloads: dict, concurrency_levels, timeout: float) -> list:
+    downloaders = cluster.peer_ids[1:]
+    results = []
+
+    for size, name in sorted(downloads.items()):
+        for concurrency in concurrency_levels:
+            peers = downloaders[:concurrency]
+            if len(peers) < concurrency:
+                continue
+
+            start = time.time()
+            jobs = {}
+            for peer_id in peers:
+                with cluster.control(peer_id) as control:
+                    jobs[peer_id] = control.download(name)
+
+            finished = {}
+
+            def all_done():
+                for peer_id, job_id in jobs.items():
+                    if peer_id not in finished:
+                        with cluster.control(peer_id) as control:
+                            job = control.job(job_id)
+                        if job.get("state") != "running":
+                            finished[peer_id] = job
+                return len(finished) == len(jobs)
+
+            wait_until(all_done, timeout, 0.05)
+            elapsed = time.time() - start
+            ok = [job for job in finished.values() if job["state"] == "done"]
+
+            results.append({
+                "file_size": size,
+                "concurrency": concurrency,
+                "completed": len(ok),
+                "seconds": elapsed,
+                "aggregate_mb_per_s": size * len(ok) / elapsed / 1e6,
+                "per_download_s": percentiles([job["elapsed"] for job in ok]),
+            })
+
+            for peer_id in peers:
+                with cluster.control(peer_id) as control:
+                    control.remove(name)
+            # Dá tempo do tracker registrar as remoções antes da próxima rodada
+            time.sleep(0.5)
+
+    return results
+
+
+def nameserver_load(before: collections.Counter, after: collections.Counter, seconds: float) -> dict:
+    calls = after - before
+    total = sum(calls.values())
+    return {
+        "seconds": seconds,
+        "requests": total,
+        "requests_per_s": total / seconds if seconds > 0 else None,
+        "by_method": dict(calls),
+    }
+
+
+def bench_nameserver(cluster: Cluster, duration: float) -> dict:
+    # Cluster parado, sem carga do benchmark: só heartbeats, manutenção e consultas dos próprios peers
+    before = cluster.ns_calls()
+    start = time.time()
+    time.sleep(duration)
+    return nameserver_load(before, cluster.ns_calls(), time.time() - start)
+
+
+def bench_failover(cluster: Cluster, timeout: float) -> dict:
+    old_epoch, _ = cluster.tracker()
+    victim = cluster.tracker_peer()
+    survivors = len(cluster.alive()) - 1
+
+    calls_before = cluster.ns_calls()
+    cluster.kill(victim)
+    killed = time.time()
+
+    def new_tracker():
+        epoch, uri = cluster.tracker()
+        if epoch <= old_epoch:
+            return None
+        try:
+            with Pyro5.api.Proxy(uri) as tracker:
+                tracker._pyroTimeout = 1.0
+                return uri if tracker.ping() else None
+        except Pyro5.errors.PyroError:
+            return None
+
+    uri = wait_until(new_tracker, timeout)
+    if uri is None:
+        return {"killed_peer": victim, "error": f"nenhum tracker novo em {timeout}s"}
+    elected = time.time()
+    calls_elected = cluster.ns_calls()
+
+    new_epoch, _ = cluster.tracker()
+
+    # Tempestade de registros: cada sobrevivente re-registra seus arquivos no tracker novo
+    def registered():
+        for peer_id in cluster.alive():
+            try:
+                with cluster.control(peer_id) as control:
+                    status = control.status()
+            except Pyro5.errors.PyroError:
+                return False
+            if not status["is_tracker"] and status["registered_epoch"] < new_epoch:
+                return False
+        return True
+
+    complete = wait_until(registered, timeout, 0.05)
+    finished = time.time()
+    calls_finished = cluster.ns_calls()
+
+    return {
+        "killed_peer": victim,
+        "survivors": survivors,
+        "failover_s": elected - killed,
+        "registration_storm_s": finished - elected if complete else None,
+        "registration_complete": bool(complete),
+        "nameserver_election": nameserver_load(calls_before, calls_elected, elected - killed),
+        "nameserver_registration": nameserver_load(calls_elected, calls_finished, finished - elected),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark reprodutível de um cluster local de peers sem interface")
+    parser.add_argument("--peers", type=int, default=8, help="Número de peers (processos)")
+    parser.add_argument("--files-per-peer", type=int, default=50, help="Arquivos pequenos gerados por peer")
+    parser.add_argument("--download-sizes", type=int, nargs="+", default=[1 << 20, 16 << 20, 64 << 20],
+                        help="Tamanhos em bytes dos arquivos baixados")
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[1, 4], help="Downloads simultâneos por rodada")
+    parser.add_argument("--search-clients", type=int, default=16, help="Clientes simultâneos de search_file")
+    parser.add_argument("--duration", type=float, default=5.0, help="Duração em segundos das medições de carga")
+    parser.add_argument("--timeout", type=float, default=60.0, help="Limite de espera de cada etapa")
+    parser.add_argument("--ns-port", type=int, default=9191, help="Porta do serviço de nomes do benchmark")
+    parser.add_argument("--seed", type=int, default=1, help="Semente do gerador de dados e das buscas")
+    parser.add_argument("--skip", nargs="*", default=[], choices=["search", "download", "nameserver", "failover"],
+                        help="Medições a pular")
+    parser.add_argument("--keep", action="store_true", help="Mantém o diretório de trabalho com os logs dos peers")
+    parser.add_argument("--json", type=str, help="Grava os resultados neste arquivo JSON")
+    args = parser.parse_args()
+
+    logging.getLogger().setLevel(logging.WARNING)
+    Pyro5.config.NS_PORT = args.ns_port
+
+    work_dir = tempfile.mkdtemp(prefix="bench_cluster_")
+    cluster = Cluster(work_dir, args.peers, args.ns_port, SERIALIZER)
+    rng = random.Random(args.seed)
+    results = {}
+
+    try:
+        dataset = build_dataset(cluster, rng, args.files_per_peer, args.download_sizes)
+        cluster.start_nameserver()
+        results["startup_s"] = cluster.start_peers(args.timeout)
+        print(f"{args.peers} peers iniciados em {results['startup_s']:.2f}s")
+
+        # Todos os arquivos gerados precisam estar no índice antes das medições
+        def indexed():
+            _, uri = cluster.tracker()
+            with Pyro5.api.Proxy(uri) as tracker:
+                return tracker.get_index_stats().get("files", 0) >= len(dataset["names"]) + len(dataset["downloads"])
+        wait_until(indexed, args.timeout, 0.1)
+
+        if "search" not in args.skip:
+            results["search"] = bench_search(cluster, dataset["names"], args.search_clients, args.duration, args.seed)
+            latency = results["search"]["latency_ms"]
+            print(f"search_file: {results['search']['requests_per_s']:.0f} req/s, "
+                  f"p50 {latency['p50']:.2f} ms, p99 {latency['p99']:.2f} ms")
+
+        if "download" not in args.skip:
+            results["download"] = bench_download(cluster, dataset["downloads"], args.concurrency, args.timeout)
+            for row in results["download"]:
+                print(f"download {row['file_size']} bytes x{row['concurrency']}: "
+                      f"{row['aggregate_mb_per_s']:.1f} MB/s ({row['completed']} concluídos)")
+
+        if "nameserver" not in args.skip:
+            results["nameserver"] = bench_nameserver(cluster, args.duration)
+            print(f"serviço de nomes em regime: {results['nameserver']['requests_per_s']:.1f} req/s "
+                  f"{results['nameserver']['by_method']}")
+
+        if "failover" not in args.skip:
+            results["failover"] = bench_failover(cluster, args.timeout)
+            failover = results["failover"]
+            if "error" in failover:
+                print(f"failover: {failover['error']}")
+            else:
+                storm = failover["registration_storm_s"]
+                print(f"failover: {failover['failover_s']:.2f}s, tempestade de registros: "
+                      f"{f'{storm:.2f}s' if storm is not None else 'incompleta'}")
+                for phase, label in (("election", "eleição"), ("registration", "tempestade de registros")):
+                    load = failover[f"nameserver_{phase}"]
+                    print(f"serviço de nomes na {label}: {load['requests']} requisições {load['by_method']}")
+    finally:
+        cluster.stop()
+        if args.keep:
+            print(f"Logs em {work_dir}")
+        else:
+            shutil.rmtree(work_dir, ignore_errors=True)
+
+    report = {
+        "config": vars(args),
+        "environment": {
+            "version": version(),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "cpus": os.cpu_count(),
+            "serializer": SERIALIZER,
+        },
+        "results": results,
+    }
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(report, f, indent=2)
+
+    return 0 if results else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,111 @@
+import os
+import sys
+import json
+import time
+import shutil
+import logging
+import argparse
+import tempfile
+import threading
+import Pyro5.api
+import Pyro5.serializers
+
+from peer import Peer, SERIALIZERS, TRANSFER_CHUNK_SIZE, _to_bytes
+
+
+def build_tracker(files_path: str, peers: int, files_per_peer: int, file_size: int) -> Peer:
+    with open(os.path.join(files_path, "bench.bin"), "wb") as f:
+        f.write(os.urandom(file_size))
+
+    tracker = Peer(0, files_path)
+    tracker.is_tracker = True
+    for peer_id in range(1, peers + 1):
+        names = [f"arquivo_{peer_id}_{n}.dat" for n in range(files_per_peer)]
+        metadata = {name: [f"{peer_id:032x}{n:032x}", n] for n, name in enumerate(names)}
+        tracker.file_index.set_peer_files(peer_id, names, metadata=metadata)
+    return tracker
+
+
+def bench_index(proxy, rounds: int) -> dict:
+    start = time.perf_counter()
+    for _ in range(rounds):
+        index = proxy.get_file_index_since(0, None)
+    elapsed = time.perf_counter() - start
+
+    entries = sum(len(files) for files in index["index"].values())
+    return {"rounds": rounds, "seconds": elapsed, "fetches_per_s": rounds / elapsed, "entries": entries}
+
+
+def bench_transfer(proxy, chunk_size: int) -> dict:
+    transfer = proxy.open_transfer("bench.bin")
+    size = transfer["size"]
+
+    start = time.perf_counter()
+    offset = 0
+    while offset < size:
+        offset += len(_to_bytes(proxy.read_chunk(transfer["transfer_id"], offset, chunk_size)))
+    elapsed = time.perf_counter() - start
+    proxy.close_transfer(transfer["transfer_id"])
+
+    return {"bytes": size, "seconds": elapsed, "mb_per_s": size / elapsed / 1e6}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compara os serializadores do Pyro na busca do índice e na transferência de arquivos")
+    parser.add_argument("--serializers", nargs="+", default=list(SERIALIZERS), help="Serializadores a medir")
+    parser.add_argument("--peers", type=int, default=50, help="Peers simulados no índice")
+    parser.add_argument("--files-per-peer", type=int, default=200, help="Arquivos por peer simulado")
+    parser.add_argument("--index-rounds", type=int, default=20, help="Buscas completas do índice por serializador")
+    parser.add_argument("--file-size", type=int, default=64 * 1024 * 1024, help="Tamanho do arquivo transferido em bytes")
+    parser.add_argument("--chunk-size", type=int, default=TRANSFER_CHUNK_SIZE, help="Tamanho do pedaço lido por RPC")
+    parser.add_argument("--json", type=str, help="Grava os resultados neste arquivo JSON")
+    args = parser.parse_args()
+
+    logging.getLogger().setLevel(logging.WARNING)
+
+    files_path = tempfile.mkdtemp(prefix="bench_serializers_")
+    tracker = build_tracker(files_path, args.peers, args.files_per_peer, args.file_size)
+
+    daemon = Pyro5.api.Daemon(host="localhost")
+    uri = daemon.register(tracker)
+    threading.Thread(target=daemon.requestLoop, daemon=True).start()
+
+    results = {}
+    try:
+        for name in args.serializers:
+            if name not in Pyro5.serializers.serializers:
+                print(f"{name}: indisponível (módulo não instalado), ignorado")
+                continue
+
+            with Pyro5.api.Proxy(uri) as proxy:
+                proxy._pyroSerializer = name
+                proxy._pyroTimeout = 60.0
+                try:
+                    results[name] = {
+                        "index": bench_index(proxy, args.index_rounds),
+                        "transfer": bench_transfer(proxy, args.chunk_size),
+                    }
+                except Exception as e:
+                    print(f"{name}: falhou: {e}")
+                    results[name] = {"error": str(e)}
+                    continue
+
+            index, transfer = results[name]["index"], results[name]["transfer"]
+            print(f"{name:>8}: índice {index['fetches_per_s']:8.1f} buscas/s ({index['entries']} entradas), "
+                  f"transferência {transfer['mb_per_s']:8.1f} MB/s")
+    finally:
+        daemon.shutdown()
+        tracker.election_executor.shutdown(wait=False)
+        tracker.heartbeat_executor.shutdown(wait=False)
+        shutil.rmtree(files_path, ignore_errors=True)
+        shutil.rmtree(os.path.normpath(files_path) + ".meta", ignore_errors=True)
+
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump({"config": vars(args), "results": results}, f, indent=2)
+
+    return 0 if results else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
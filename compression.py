@@ -0,0 +1,87 @@
+import os
+import bz2
+import lzma
+import time
+import zlib
+from typing import Dict, List, Optional
+
+# Níveis rápidos: a compressão precisa andar mais rápido que o link para compensar
+CODECS = {
+    "zlib": (lambda data: zlib.compress(data, 1), zlib.decompress),
+    "bz2": (lambda data: bz2.compress(data, 1), bz2.decompress),
+    "lzma": (lambda data: lzma.compress(data, preset=0), lzma.decompress),
+}
+
+COMPRESSED_EXTENSIONS = {
+    ".7z", ".avi", ".bz2", ".docx", ".flac", ".gif", ".gz", ".jar", ".jpeg", ".jpg", ".lz", ".lzma", ".mkv",
+    ".mov", ".mp3", ".mp4", ".ogg", ".pdf", ".png", ".pptx", ".rar", ".tgz", ".webm", ".webp", ".xlsx",
+    ".xz", ".zip", ".zst",
+}
+
+SAMPLE_SIZE = 64 * 1024
+SAMPLE_COUNT = 3
+MAX_SAMPLE_RATIO = 0.9
+MIN_GAIN = 0.9
+DEFAULT_LINK_RATE = 12.5e6
+
+
+def compress(codec: str, data) -> bytes:
+    return CODECS[codec][0](data)
+
+
+def decompress(codec: str, data) -> bytes:
+    return CODECS[codec][1](data)
+
+
+def already_compressed(filename: str) -> bool:
+    return os.path.splitext(filename)[1].lower() in COMPRESSED_EXTENSIONS
+
+
+def _sample(path: str, size: int) -> bytes:
+    if size <= SAMPLE_SIZE * SAMPLE_COUNT:
+        with open(path, "rb") as f:
+            return f.read()
+
+    step = (size - SAMPLE_SIZE) // (SAMPLE_COUNT - 1)
+    with open(path, "rb") as f:
+        return b"".join(os.pread(f.fileno(), SAMPLE_SIZE, i * step) for i in range(SAMPLE_COUNT))
+
+
+def profile(path: str, size: int, codecs: List[str]) -> Dict[str, dict]:
+    data = _sample(path, size)
+    if not data:
+        return {}
+
+    results = {}
+    for codec in codecs:
+        start = time.perf_counter()
+        packed = compress(codec, data)
+        compress_time = time.perf_counter() - start
+
+        start = time.perf_counter()
+        decompress(codec, packed)
+        decompress_time = time.perf_counter() - start
+
+        results[codec] = {
+            "ratio": len(packed) / len(data),
+            "compress_rate": len(data) / max(compress_time, 1e-9),
+            "decompress_rate": len(data) / max(decompress_time, 1e-9),
+        }
+    return results
+
+
+def choose(measurements: Dict[str, dict], link_rate: Optional[float]) -> Optional[str]:
+    link_rate = link_rate or DEFAULT_LINK_RATE
+    best, best_cost = None, None
+
+    # Custo por byte original: comprimir + enviar o que sobrou + descomprimir, contra só enviar
+    for codec, m in measurements.items():
+        if m["ratio"] > MAX_SAMPLE_RATIO:
+            continue
+        cost = 1 / m["compress_rate"] + m["ratio"] / link_rate + 1 / m["decompress_rate"]
+        if best_cost is None or cost < best_cost:
+            best, best_cost = codec, cost
+
+    if best is None or best_cost > MIN_GAIN / link_rate:
+        return None
+    return best
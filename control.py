@@ -0,0 +1,145 @@
+import os
+import time
+import uuid
+import threading
+import concurrent.futures
+import Pyro5.api
+from typing import Dict, List
+
+from peer import _to_bytes
+
+CONTROL_PREFIX = "control."
+CONTROL_MAX_DOWNLOADS = 4
+CONTROL_MAX_JOBS = 100
+
+
+class PeerControl:
+    def __init__(self, peer):
+        self.peer = peer
+        self.jobs: Dict[str, dict] = {}
+        self.jobs_lock = threading.Lock()
+        # O daemon é multiplex: downloads rodam fora dele para não travar os outros comandos
+        self.executor = concurrent.futures.ThreadPoolExecutor(
+            max_workers=CONTROL_MAX_DOWNLOADS, thread_name_prefix=f"Peer-{peer.peer_id}-control"
+        )
+
+    @Pyro5.api.expose
+    def status(self) -> Dict:
+        peer = self.peer
+        return {
+            "peer_id": peer.peer_id,
+            "uri": str(peer.uri),
+            "is_tracker": peer.is_tracker,
+            "epoch": peer.current_epoch,
+            "registered_epoch": peer.registered_epoch,
+            "tracker_uri": str(peer.tracker_uri) if peer.tracker_uri else None,
+            "last_heartbeat": peer.last_heartbeat,
+            "files": len(peer.get_local_files()),
+        }
+
+    @Pyro5.api.expose
+    def list_files(self) -> List[str]:
+        return sorted(self.peer.get_local_files())
+
+    @Pyro5.api.expose
+    def add(self, filename: str, content) -> bool:
+        return self.peer.add_file(os.path.basename(filename), _to_bytes(content))
+
+    @Pyro5.api.expose
+    def remove(self, filename: str) -> bool:
+        return self.peer.remove_file(os.path.basename(filename))
+
+    @Pyro5.api.expose
+    def search(self, pattern: str, mode: str = "exact", offset: int = 0, limit: int = 100) -> Dict:
+        return self.peer.query_files_from_tracker(pattern, mode, offset, limit)
+
+    @Pyro5.api.expose
+    def download(self, filename: str, peer_id: int = None) -> str:
+        job_id = uuid.uuid4().hex[:8]
+        job = {"filename": filename, "peer_id": peer_id, "state": "running", "started": time.time(), "elapsed": None}
+
+        with self.jobs_lock:
+            finished = [key for key, other in self.jobs.items() if other["state"] != "running"]
+            for key in finished[:max(0, len(self.jobs) - CONTROL_MAX_JOBS + 1)]:
+                del self.jobs[key]
+            self.jobs[job_id] = job
+
+        self.executor.submit(self._run_download, job)
+        return job_id
+
+    def _run_download(self, job: dict):
+        filename = job["filename"]
+        try:
+            if filename in self.peer.get_local_files():
+                self.peer.logger.info(f"Arquivo {filename} já existe localmente")
+                ok = True
+            elif job["peer_id"] is None:
+                ok = self.peer.download_file_swarm(filename)
+            else:
+                ok = self.peer.download_file_from_peer(job["peer_id"], filename)
+        except Exception as e:
+            self.peer.logger.error(f"Erro no download de {filename} pelo controle: {e}")
+            ok = False
+
+        with self.jobs_lock:
+            job["state"] = "done" if ok else "failed"
+            job["elapsed"] = time.time() - job["started"]
+
+    @Pyro5.api.expose
+    def job(self, job_id: str) -> Dict:
+        with self.jobs_lock:
+            job = self.jobs.get(job_id)
+            return dict(job) if job else {}
+
+    @Pyro5.api.expose
+    def jobs_list(self) -> Dict[str, dict]:
+        with self.jobs_lock:
+            return {job_id: dict(job) for job_id, job in self.jobs.items()}
+
+    @Pyro5.api.expose
+    def stats(self) -> Dict:
+        return self.peer.get_stats()
+
+    @Pyro5.api.expose
+    def elect(self) -> bool:
+        self.peer.start_election()
+        return True
+
+    def close(self):
+        self.executor.shutdown(wait=False, cancel_futures=True)
+
+
+class ControlServer:
+    def __init__(self, peer, port: int = 0):
+        self.peer = peer
+        self.port = port
+        self.control = PeerControl(peer)
+        self.daemon = None
+        self.uri = None
+        self.name = f"{CONTROL_PREFIX}{peer.peer_id}"
+
+    def start(self):
+        self.daemon = Pyro5.api.Daemon(host="localhost", port=self.port)
+        self.uri = self.daemon.register(self.control, "control")
+        threading.Thread(target=self.daemon.requestLoop, daemon=True, name=f"Peer-{self.peer.peer_id}-control").start()
+
+        try:
+            Pyro5.api.locate_ns().register(self.name, self.uri)
+        except Exception as e:
+            self.peer.logger.warning(f"Erro ao registrar controle no serviço de nomes: {e}")
+
+        self.peer.logger.info(f"Controle local em {self.uri}")
+
+    def stop(self):
+        try:
+            Pyro5.api.locate_ns().remove(self.name)
+        except Exception as e:
+            self.peer.logger.warning(f"Erro ao remover controle do serviço de nomes: {e}")
+
+        if self.daemon:
+            self.daemon.shutdown()
+        self.control.close()
+
+
+def connect(peer_id: int):
+    return Pyro5.api.Proxy(f"PYRONAME:{CONTROL_PREFIX}{peer_id}")
@@ -0,0 +1,202 @@
+import os
+import socket
+import selectors
+import struct
+import logging
+import time
+import secrets
+import threading
+from typing import Callable, Dict, Optional
+
+import compression
+
+TOKEN_SIZE = 32
+REQUEST = struct.Struct("!QI")
+RESPONSE = struct.Struct("!IB")
+RAW, COMPRESSED = 0, 1
+SOCKET_TIMEOUT = 30.0
+
+
+def _recv_exact(sock: socket.socket, view: memoryview):
+    received = 0
+    while received < len(view):
+        n = sock.recv_into(view[received:])
+        if n == 0:
+            raise ConnectionError("Canal de dados encerrado pelo outro lado")
+        received += n
+
+
+def _wait_writable(sock: socket.socket):
+    with selectors.DefaultSelector() as selector:
+        selector.register(sock, selectors.EVENT_WRITE)
+        if not selector.select(sock.gettimeout()):
+            raise TimeoutError("Canal de dados sem progresso no envio")
+
+
+def new_token() -> str:
+    return secrets.token_hex(TOKEN_SIZE // 2)
+
+
+class DataChannelServer:
+    def __init__(self, logger: logging.Logger, lookup: Callable[[str], Optional[Dict]], max_chunk_size: int,
+                 host: str = "localhost"):
+        # lookup(token) devolve a transferência aberta ({"file", "lock", "last_access", "codec"}) ou None
+        self.logger = logger
+        self.lookup = lookup
+        self.max_chunk_size = max_chunk_size
+        self.sock = socket.create_server((host, 0))
+        self.host, self.port = self.sock.getsockname()[:2]
+        self.stopped = False
+        self.stats_lock = threading.Lock()
+        self.bytes_sent = 0
+        self.bytes_raw = 0
+        self.chunks_compressed = 0
+        self.chunks_raw = 0
+        self.thread = threading.Thread(target=self._accept_loop, daemon=True)
+
+    def start(self):
+        self.thread.start()
+
+    def stop(self):
+        self.stopped = True
+        try:
+            self.sock.close()
+        except OSError:
+            pass
+
+    def _accept_loop(self):
+        while not self.stopped:
+            try:
+                conn, _ = self.sock.accept()
+            except OSError:
+                return
+            threading.Thread(target=self._serve, args=(conn,), daemon=True).start()
+
+    def _serve(self, conn: socket.socket):
+        with conn:
+            try:
+                conn.settimeout(SOCKET_TIMEOUT)
+                token = bytearray(TOKEN_SIZE)
+                _recv_exact(conn, memoryview(token))
+                transfer = self.lookup(token.decode("ascii", "replace"))
+                if transfer is None:
+                    self.logger.warning("Canal de dados recusado: token desconhecido")
+                    return
+
+                header = bytearray(REQUEST.size)
+                while True:
+                    try:
+                        _recv_exact(conn, memoryview(header))
+                    except ConnectionError:
+                        return
+                    offset, length = REQUEST.unpack(header)
+                    self._send_range(conn, transfer, offset, length)
+            except Exception as e:
+                if not self.stopped:
+                    self.logger.warning(f"Erro no canal de dados: {e}")
+
+    def _send_range(self, conn: socket.socket, transfer: Dict, offset: int, length: int):
+        f = transfer["file"]
+        size = os.fstat(f.fileno()).st_size
+        length = max(0, min(length, self.max_chunk_size, size - offset))
+        transfer["last_access"] = time.time()
+
+        codec = transfer.get("codec")
+        if codec and length:
+            with transfer["lock"]:
+                f.seek(offset)
+                data = f.read(length)
+            payload = compression.compress(codec, data)
+            # Pedaços que não encolhem vão crus, mesmo com compressão negociada
+            if len(payload) < len(data):
+                conn.sendall(RESPONSE.pack(len(payload), COMPRESSED))
+                conn.sendall(payload)
+                self._count(len(payload), len(data), True)
+                return
+            conn.sendall(RESPONSE.pack(len(data), RAW))
+            conn.sendall(data)
+            self._count(len(data), len(data), False)
+            return
+
+        conn.sendall(RESPONSE.pack(length, RAW))
+
+        sent = 0
+        while sent < length:
+            if hasattr(os, "sendfile"):
+                # Com offset explícito o sendfile não mexe na posição do arquivo compartilhado com read_chunk
+                try:
+                    n = os.sendfile(conn.fileno(), f.fileno(), offset + sent, length - sent)
+                except BlockingIOError:
+                    # Com timeout o socket é não bloqueante: um cliente lento enche o buffer e o envio espera
+                    _wait_writable(conn)
+                    continue
+            else:
+                with transfer["lock"]:
+                    f.seek(offset + sent)
+                    data = f.read(length - sent)
+                conn.sendall(data)
+                n = len(data)
+            if n == 0:
+                raise IOError(f"Arquivo truncado durante envio em {offset + sent}")
+            sent += n
+        self._count(sent, sent, False)
+
+    def _count(self, wire: int, raw: int, compressed: bool):
+        with self.stats_lock:
+            self.bytes_sent += wire
+            self.bytes_raw += raw
+            if compressed:
+                self.chunks_compressed += 1
+            else:
+                self.chunks_raw += 1
+
+    def stats(self) -> Dict[str, int]:
+        with self.stats_lock:
+            return {
+                "bytes_sent": self.bytes_sent,
+                "bytes_raw": self.bytes_raw,
+                "chunks_compressed": self.chunks_compressed,
+                "chunks_raw": self.chunks_raw,
+            }
+
+
+class DataChannelClient:
+    def __init__(self, host: str, port: int, token: str, buffer_size: int, codec: str = None):
+        self.sock = socket.create_connection((host, port), timeout=SOCKET_TIMEOUT)
+        self.sock.sendall(token.encode("ascii"))
+        self.buffer = bytearray(buffer_size)
+        self.header = bytearray(RESPONSE.size)
+        self.codec = codec
+        self.bytes_received = 0
+        self.bytes_raw = 0
+        self.wire_time = 0.0
+
+    def read(self, offset: int, length: int) -> memoryview:
+        # A visão devolvida aponta para o buffer reaproveitado e só vale até a próxima leitura
+        if length > len(self.buffer):
+            self.buffer = bytearray(length)
+
+        start = time.perf_counter()
+        self.sock.sendall(REQUEST.pack(offset, length))
+        _recv_exact(self.sock, memoryview(self.header))
+        available, kind = RESPONSE.unpack(self.header)
+        if available > length:
+            raise IOError(f"Canal de dados enviou {available} bytes, esperados no máximo {length}")
+
+        view = memoryview(self.buffer)[:available]
+        _recv_exact(self.sock, view)
+        self.wire_time += time.perf_counter() - start
+        self.bytes_received += available
+
+        if kind == COMPRESSED:
+            if not self.codec:
+                raise IOError("Canal de dados enviou pedaço comprimido sem compressão negociada")
+            view = memoryview(compression.decompress(self.codec, view))
+        self.bytes_raw += len(view)
+        return view
+
+    def close(self):
+        try:
+            self.sock.close()
+        except OSError:
+            pass
@@ -7,6 +7,14 @@ from typing import Optional
 
 from peer import Peer
 
+SEARCH_MODES = {
+    "Exato": "exact",
+    "Prefixo": "prefix",
+    "Glob": "glob",
+    "Contém": "substring",
+}
+SEARCH_PAGE_SIZE = 100
+
 class PeerGUI:
     def __init__(self, peer_id: int, files_path: Optional[str] = None):
         self.peer = Peer(peer_id, files_path)
@@ -111,8 +119,14 @@ class PeerGUI:
         ttk.Label(search_control, text="Arquivo:").pack(side=tk.LEFT, padx=5)
         self.search_entry = ttk.Entry(search_control, width=30)
         self.search_entry.pack(side=tk.LEFT, padx=5)
+        self.search_mode = ttk.Combobox(search_control, values=list(SEARCH_MODES), state="readonly", width=10)
+        self.search_mode.current(0)
+        self.search_mode.pack(side=tk.LEFT, padx=5)
         ttk.Button(search_control, text="Buscar", command=self._search_file).pack(side=tk.LEFT, padx=5)
 
+        self.search_offset = 0
+        self.search_total = 0
+
         results_frame = ttk.Frame(self.search_frame)
         results_frame.pack(side=tk.TOP, expand=True, fill=tk.BOTH, padx=5, pady=5)
 
@@ -134,6 +148,12 @@ class PeerGUI:
         download_frame.pack(side=tk.BOTTOM, fill=tk.X, padx=5, pady=5)
 
         ttk.Button(download_frame, text="Baixar Arquivo Selecionado", command=self._download_selected_file).pack(side=tk.LEFT, padx=5)
+        ttk.Button(download_frame, text="Baixar de Todos os Peers", command=self._download_swarm_file).pack(side=tk.LEFT, padx=5)
+
+        ttk.Button(download_frame, text="Próxima", command=lambda: self._search_page(SEARCH_PAGE_SIZE)).pack(side=tk.RIGHT, padx=5)
+        ttk.Button(download_frame, text="Anterior", command=lambda: self._search_page(-SEARCH_PAGE_SIZE)).pack(side=tk.RIGHT, padx=5)
+        self.search_page_label = ttk.Label(download_frame, text="")
+        self.search_page_label.pack(side=tk.RIGHT, padx=5)
 
 
     def _setup_tracker_tab(self):
@@ -231,30 +251,42 @@ class PeerGUI:
         else:
             self.last_heartbeat_label.config(text="Nunca recebido")
 
-        total_files = 0
-        file_index = self.peer.get_all_network_files()
-        for peer_id, files in file_index.items():
-            total_files += len(files)
+        stats = self.peer.get_network_stats()
+        self.total_files_label.config(text=str(stats.get("files", 0)))
 
-        self.total_files_label.config(text=str(total_files))
 
-
-    def _search_file(self):
-        filename = self.search_entry.get().strip()
-        if not filename:
+    def _search_file(self, offset: int = 0):
+        pattern = self.search_entry.get().strip()
+        if not pattern:
             messagebox.showwarning("Busca de Arquivo", "Digite o nome do arquivo a ser buscado.")
             return
 
         self.search_results_tree.delete(*self.search_results_tree.get_children())
 
-        peers_with_file = self.peer.search_file_from_tracker(filename)
+        mode = SEARCH_MODES[self.search_mode.get()]
+        result = self.peer.query_files_from_tracker(pattern, mode, offset, SEARCH_PAGE_SIZE)
+
+        self.search_offset = offset
+        self.search_total = result.get("total", 0)
 
-        if not peers_with_file:
-            messagebox.showinfo("Busca de Arquivo", f"Arquivo '{filename}' não encontrado na rede.")
+        if not result.get("results"):
+            self.search_page_label.config(text="")
+            messagebox.showinfo("Busca de Arquivo", f"Arquivo '{pattern}' não encontrado na rede.")
             return
 
-        for peer_id in peers_with_file:
-            self.search_results_tree.insert("", tk.END, values=(peer_id, filename))
+        for filename, peer_ids in result["results"]:
+            for peer_id in peer_ids:
+                self.search_results_tree.insert("", tk.END, values=(peer_id, filename))
+
+        last = min(offset + SEARCH_PAGE_SIZE, self.search_total)
+        self.search_page_label.config(text=f"{offset + 1}-{last} de {self.search_total}")
+
+
+    def _search_page(self, delta: int):
+        offset = self.search_offset + delta
+        if offset < 0 or offset >= self.search_total:
+            return
+        self._search_file(offset)
 
 
     def _download_selected_file(self):
@@ -287,6 +319,34 @@ class PeerGUI:
         threading.Thread(target=download_thread).start()
 
 
+    def _download_swarm_file(self):
+        selected_item = self.search_results_tree.selection()
+        if not selected_item:
+            messagebox.showwarning("Download de Arquivo", "Selecione um arquivo para baixar.")
+            return
+
+        filename = self.search_results_tree.item(selected_item[0], "values")[1]
+
+        if filename in self.peer.get_local_files():
+            response = messagebox.askyesno(
+                "Download de Arquivo",
+                f"O arquivo '{filename}' já existe localmente. Deseja substituí-lo?"
+            )
+            if not response:
+                return
+
+        def download_thread():
+            success = self.peer.download_file_swarm(filename)
+
+            if success:
+                messagebox.showinfo("Download de Arquivo", f"Arquivo '{filename}' baixado com sucesso.")
+                self._update_local_files()
+            else:
+                messagebox.showerror("Download de Arquivo", f"Erro ao baixar arquivo '{filename}'.")
+
+        threading.Thread(target=download_thread).start()
+
+
     def _download_network_file(self):
         selected_item = self.network_tree.selection()
         if not selected_item:
@@ -397,6 +457,7 @@ class PeerGUI:
             if not response:
                 return
 
+        self.peer.stop()
         self.root.destroy()
 
 
@@ -0,0 +1,174 @@
+import os
+import time
+import logging
+import threading
+import concurrent.futures
+import Pyro5.api
+from typing import Dict, List, Optional
+
+from control import CONTROL_PREFIX, PeerControl
+from data_channel import DataChannelServer
+from peer import Peer, TrackerResolver, DEFAULT_FILES_PATH, TRANSFER_MAX_CHUNK_SIZE
+from pool import ProxyPool
+from scheduler import default_scheduler
+
+HOST_ELECTION_WORKERS = 32
+HOST_HEARTBEAT_WORKERS = 64
+HOST_MERKLE_WORKERS = 4
+HOST_TRACKER_WAIT = 10.0
+
+try:
+    import resource
+except ImportError:
+    resource = None
+
+
+def _raise_file_limit():
+    # Cada peer mantém conexões com o tracker e o tracker com cada peer, todas no mesmo processo
+    if resource is None:
+        return
+    soft, hard = resource.getrlimit(resource.RLIMIT_NOFILE)
+    if hard == resource.RLIM_INFINITY or soft < hard:
+        try:
+            resource.setrlimit(resource.RLIMIT_NOFILE, (hard, hard))
+        except (ValueError, OSError):
+            pass
+
+
+class PeerHost:
+    def __init__(self, files_path: str = DEFAULT_FILES_PATH, watch: bool = False, control: bool = False):
+        self.logger = logging.getLogger("PeerHost")
+        self.files_path = files_path
+        self.watch = watch
+        self.control = control
+
+        self.pool = ProxyPool()
+        self.resolver = TrackerResolver(self.logger, self.pool)
+        self.scheduler = default_scheduler()
+        self.election_executor = concurrent.futures.ThreadPoolExecutor(
+            max_workers=HOST_ELECTION_WORKERS, thread_name_prefix="PeerHost-election"
+        )
+        self.heartbeat_executor = concurrent.futures.ThreadPoolExecutor(
+            max_workers=HOST_HEARTBEAT_WORKERS, thread_name_prefix="PeerHost-heartbeat"
+        )
+        self.merkle_executor = concurrent.futures.ThreadPoolExecutor(
+            max_workers=HOST_MERKLE_WORKERS, thread_name_prefix="PeerHost-merkle"
+        )
+
+        self.daemon = None
+        self.control_daemon = None
+        self.data_channel = None
+        self.peers: Dict[int, Peer] = {}
+        self.controls: Dict[int, PeerControl] = {}
+        self.lock = threading.Lock()
+
+    def start(self):
+        _raise_file_limit()
+
+        self.daemon = Pyro5.api.Daemon(host="localhost")
+        threading.Thread(target=self.daemon.requestLoop, daemon=True, name="PeerHost-daemon").start()
+
+        if self.control:
+            # Comandos de controle chamam o tracker, que pode estar neste mesmo host: no daemon dos peers, a
+            # thread única do multiplex ficaria presa esperando por ela mesma
+            self.control_daemon = Pyro5.api.Daemon(host="localhost")
+            threading.Thread(target=self.control_daemon.requestLoop, daemon=True, name="PeerHost-control").start()
+
+        self.data_channel = DataChannelServer(self.logger, self._data_channel_transfer, TRANSFER_MAX_CHUNK_SIZE)
+        self.data_channel.start()
+        self.logger.info(f"Host iniciado: daemon em {self.daemon.locationStr}, canal de dados em {self.data_channel.port}")
+
+    def _data_channel_transfer(self, token: str) -> Optional[Dict]:
+        with self.lock:
+            peers = list(self.peers.values())
+        for peer in peers:
+            transfer = peer._data_channel_transfer(token)
+            if transfer is not None:
+                return transfer
+        return None
+
+    def add_peer(self, peer_id: int) -> Peer:
+        peer = Peer(peer_id, os.path.join(self.files_path, f"peer_{peer_id}"), host=self)
+        with self.lock:
+            self.peers[peer_id] = peer
+
+        if not peer.start():
+            with self.lock:
+                self.peers.pop(peer_id, None)
+            raise RuntimeError(f"Falha ao iniciar peer {peer_id}")
+
+        if self.control:
+            control = PeerControl(peer)
+            Pyro5.api.locate_ns().register(f"{CONTROL_PREFIX}{peer_id}", self.control_daemon.register(control))
+            self.controls[peer_id] = control
+        return peer
+
+    def start_peers(self, peer_ids: List[int]) -> float:
+        start = time.time()
+        if not peer_ids:
+            return 0.0
+
+        # Só o primeiro peer elege um tracker; os demais entram num cluster já formado em vez de disputar eleições
+        self.add_peer(peer_ids[0])
+        deadline = time.time() + HOST_TRACKER_WAIT
+        while self.resolver.resolve()[1] is None and time.time() < deadline:
+            time.sleep(0.1)
+
+        for peer_id in peer_ids[1:]:
+            self.add_peer(peer_id)
+
+        elapsed = time.time() - start
+        self.logger.info(f"{len(peer_ids)} peers iniciados em {elapsed:.2f}s")
+        return elapsed
+
+    def remove_peer(self, peer_id: int):
+        with self.lock:
+            peer = self.peers.pop(peer_id, None)
+        if peer is None:
+            return
+
+        control = self.controls.pop(peer_id, None)
+        if control is not None:
+            try:
+                Pyro5.api.locate_ns().remove(f"{CONTROL_PREFIX}{peer_id}")
+            except Exception as e:
+                self.logger.warning(f"Erro ao remover controle do peer {peer_id}: {e}")
+            self.control_daemon.unregister(control)
+            control.close()
+
+        peer.stop()
+
+    def tracker(self) -> Optional[Peer]:
+        with self.lock:
+            return next((peer for peer in self.peers.values() if peer.is_tracker), None)
+
+    def stats(self) -> Dict:
+        with self.lock:
+            peers = list(self.peers.values())
+        return {
+            "peers": len(peers),
+            "trackers": [peer.peer_id for peer in peers if peer.is_tracker],
+            "threads": threading.active_count(),
+            "scheduler_pending": self.scheduler.pending(),
+            "proxy_pool": self.pool.stats(),
+            "tracker_lookups": self.resolver.lookups,
+            "data_channel": self.data_channel.stats() if self.data_channel else {},
+        }
+
+    def stop(self):
+        with self.lock:
+            peer_ids = sorted(self.peers, key=lambda peer_id: self.peers[peer_id].is_tracker)
+        # O tracker sai por último para que os demais ainda consigam avisar a saída
+        for peer_id in peer_ids:
+            self.remove_peer(peer_id)
+
+        if self.daemon:
+            self.daemon.shutdown()
+        if self.control_daemon:
+            self.control_daemon.shutdown()
+        if self.data_channel:
+            self.data_channel.stop()
+        self.election_executor.shutdown(wait=False, cancel_futures=True)
+        self.heartbeat_executor.shutdown(wait=False, cancel_futures=True)
+        self.merkle_executor.shutdown(wait=False, cancel_futures=True)
+        self.logger.info("Host encerrado")
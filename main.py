@@ -1,7 +1,12 @@
 import sys
 import os
+import json
 import time
+import base64
+import signal
+import asyncio
 import argparse
+import threading
 import Pyro5.api
 import Pyro5.nameserver
 import subprocess
@@ -51,7 +56,147 @@ def start_peer(peer_id, files_dir=None):
     peer_gui.run()
 
 
-def start_all_peers(num_peers=5, nameserver=True):
+def start_headless_peer(peer_id, files_dir=None, runtime="threads", control_port=0):
+    print(f"Iniciando peer {peer_id} sem interface gráfica ({runtime})...")
+
+    if not files_dir:
+        files_dir = os.path.join("files", f"peer_{peer_id}")
+
+    os.makedirs(files_dir, exist_ok=True)
+
+    if runtime == "asyncio":
+        asyncio.run(_serve_async_peer(peer_id, files_dir, control_port))
+        return
+
+    stop_event = threading.Event()
+    signal.signal(signal.SIGTERM, lambda signum, frame: stop_event.set())
+
+    from peer import Peer
+    from control import ControlServer
+
+    peer = Peer(peer_id, files_dir)
+    if not peer.start():
+        print(f"Falha ao iniciar peer {peer_id}.")
+        return
+
+    control = ControlServer(peer, control_port)
+    control.start()
+    print(f"Peer {peer_id} rodando. Controle em {control.uri}. Pressione Ctrl+C para encerrar.")
+
+    try:
+        stop_event.wait()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        control.stop()
+        peer.stop()
+
+
+async def _serve_async_peer(peer_id, files_dir, control_port):
+    from async_peer import AsyncPeer
+    from control import ControlServer
+
+    loop = asyncio.get_running_loop()
+    stop_event = asyncio.Event()
+    previous_handlers = {}
+    for signum in (signal.SIGINT, signal.SIGTERM):
+        try:
+            loop.add_signal_handler(signum, stop_event.set)
+        except NotImplementedError:
+            # Loops sem suporte a sinais (Windows): o handler roda fora do loop
+            previous_handlers[signum] = signal.signal(signum, lambda signum, frame: loop.call_soon_threadsafe(stop_event.set))
+
+    peer = AsyncPeer(peer_id, files_dir)
+    if not await peer.start_async():
+        print(f"Falha ao iniciar peer {peer_id}.")
+        return
+
+    control = ControlServer(peer, control_port)
+    control.start()
+    print(f"Peer {peer_id} rodando. Controle em {control.uri}. Pressione Ctrl+C para encerrar.")
+
+    try:
+        await stop_event.wait()
+    except asyncio.CancelledError:
+        pass
+    finally:
+        for signum in (signal.SIGINT, signal.SIGTERM):
+            if signum in previous_handlers:
+                signal.signal(signum, previous_handlers[signum])
+            else:
+                loop.remove_signal_handler(signum)
+        control.stop()
+        await peer.stop_async()
+
+
+def start_host(num_peers=10, first_id=1, files_dir="files", watch=False, control=False, nameserver=True):
+    ns_proc = start_nameserver() if nameserver else None
+
+    from host import PeerHost
+
+    os.makedirs(files_dir, exist_ok=True)
+
+    stop_event = threading.Event()
+    signal.signal(signal.SIGTERM, lambda signum, frame: stop_event.set())
+
+    host = PeerHost(files_dir, watch=watch, control=control)
+    host.start()
+    try:
+        elapsed = host.start_peers(list(range(first_id, first_id + num_peers)))
+        print(f"{num_peers} peers rodando em um processo (iniciados em {elapsed:.2f}s). Pressione Ctrl+C para encerrar.")
+        print(json.dumps(host.stats(), indent=2, default=str))
+        stop_event.wait()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        host.stop()
+        if ns_proc:
+            ns_proc.kill()
+
+
+def run_control_command(peer_id, command, args, wait=False):
+    from control import connect
+
+    control = connect(peer_id)
+
+    if command == "status":
+        result = control.status()
+    elif command == "files":
+        result = control.list_files()
+    elif command == "add":
+        results = {}
+        for path in args:
+            with open(path, "rb") as f:
+                content = {"data": base64.b64encode(f.read()).decode("ascii"), "encoding": "base64"}
+            results[os.path.basename(path)] = control.add(os.path.basename(path), content)
+        result = results
+    elif command == "remove":
+        result = {filename: control.remove(filename) for filename in args}
+    elif command == "search":
+        pattern = args[0] if args else ""
+        mode = args[1] if len(args) > 1 else "substring"
+        result = control.search(pattern, mode)
+    elif command == "download":
+        source = int(args[1]) if len(args) > 1 else None
+        job_id = control.download(args[0], source)
+        result = control.job(job_id)
+        while wait and result.get("state") == "running":
+            time.sleep(0.2)
+            result = control.job(job_id)
+        result["job_id"] = job_id
+    elif command == "jobs":
+        result = control.jobs_list()
+    elif command == "stats":
+        result = control.stats()
+    elif command == "elect":
+        result = control.elect()
+    else:
+        raise ValueError(f"Comando desconhecido: {command}")
+
+    print(json.dumps(result, indent=2, ensure_ascii=False, default=str))
+
+
+def start_all_peers(num_peers=5, nameserver=True, headless=False):
     ns_proc = None
 
     if nameserver:
@@ -70,9 +215,10 @@ def start_all_peers(num_peers=5, nameserver=True):
 
     peer_processes = []
     for i in range(1, num_peers + 1):
-        peer_proc = subprocess.Popen(
-            [sys.executable, __file__, "--peer", str(i)],
-        )
+        command = [sys.executable, __file__, "--peer", str(i)]
+        if headless:
+            command = [sys.executable, __file__, "peer", "--peer", str(i), "--headless"]
+        peer_proc = subprocess.Popen(command)
 
         peer_processes.append(peer_proc)
         time.sleep(1)
@@ -96,24 +242,57 @@ def main():
     all_parser = subparsers.add_parser("all", help="Iniciar todos os componentes")
     all_parser.add_argument("--peers", type=int, default=5, help="Número de peers para iniciar")
     all_parser.add_argument("--no-nameserver", action="store_true", help="Não iniciar serviço de nomes (assume que já está rodando)")
+    all_parser.add_argument("--headless", action="store_true", help="Iniciar os peers sem interface gráfica")
 
     ns_parser = subparsers.add_parser("nameserver", help="Iniciar apenas o serviço de nomes")
 
     peer_parser = subparsers.add_parser("peer", help="Iniciar um peer individual")
     peer_parser.add_argument("--peer", type=int, required=True, help="ID do peer")
     peer_parser.add_argument("--files-dir", type=str, help="Diretório para armazenar arquivos")
-
+    peer_parser.add_argument("--headless", action="store_true", help="Rodar sem interface gráfica, com controle local via Pyro")
+    peer_parser.add_argument("--runtime", choices=["threads", "asyncio"], default="threads", help="Modelo de execução do peer sem interface")
+    peer_parser.add_argument("--control-port", type=int, default=0, help="Porta do controle local (padrão: qualquer porta livre)")
+
+    host_parser = subparsers.add_parser("host", help="Rodar vários peers sem interface em um único processo")
+    host_parser.add_argument("--peers", type=int, default=10, help="Número de peers no processo")
+    host_parser.add_argument("--first-id", type=int, default=1, help="ID do primeiro peer")
+    host_parser.add_argument("--files-dir", type=str, default="files", help="Diretório base dos arquivos dos peers")
+    host_parser.add_argument("--watch", action="store_true", help="Monitorar os diretórios dos peers (uma thread por peer)")
+    host_parser.add_argument("--control", action="store_true", help="Registrar o controle local de cada peer (control.<id>)")
+    host_parser.add_argument("--no-nameserver", action="store_true", help="Não iniciar serviço de nomes (assume que já está rodando)")
+
+    ctl_parser = subparsers.add_parser("ctl", help="Enviar um comando a um peer sem interface")
+    ctl_parser.add_argument("--peer", type=int, required=True, help="ID do peer")
+    ctl_parser.add_argument("--wait", action="store_true", help="Aguardar o fim do download")
+    ctl_parser.add_argument("command", choices=["status", "files", "add", "remove", "search", "download", "jobs", "stats", "elect"])
+    ctl_parser.add_argument("args", nargs="*", help="Arquivos, padrão de busca ou nome do arquivo e ID do peer de origem")
+
+    parser.add_argument("--serializer", choices=["serpent", "marshal", "msgpack", "json"],
+                        help="Serializador do Pyro usado por todos os peers (padrão: serpent ou $P2P_SERIALIZER)")
     parser.add_argument("--peer", type=int, help=argparse.SUPPRESS)
     parser.add_argument("--files-dir", type=str, help=argparse.SUPPRESS)
 
     args = parser.parse_args()
 
-    if args.peer:
+    if args.serializer:
+        # Processos filhos herdam o ambiente, então todos os peers usam o mesmo serializador
+        os.environ["P2P_SERIALIZER"] = args.serializer
+
+    if args.mode == "ctl":
+
+        run_control_command(args.peer, args.command, args.args, args.wait)
+    elif args.mode == "host":
+
+        start_host(args.peers, args.first_id, args.files_dir, args.watch, args.control, not args.no_nameserver)
+    elif args.mode == "peer" and args.headless:
+
+        start_headless_peer(args.peer, args.files_dir, args.runtime, args.control_port)
+    elif args.peer:
 
         start_peer(args.peer, args.files_dir)
     elif args.mode == "all":
 
-        start_all_peers(args.peers, not args.no_nameserver)
+        start_all_peers(args.peers, not args.no_nameserver, args.headless)
     elif args.mode == "nameserver":
 
         ns_proc = start_nameserver()
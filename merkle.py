@@ -0,0 +1,44 @@
+import hashlib
+from typing import Dict, List, Tuple
+
+
+def chunk_hash(data: bytes) -> str:
+    return hashlib.sha256(data).hexdigest()
+
+
+def merkle_root(leaves: List[str]) -> str:
+    if not leaves:
+        return hashlib.sha256(b"").hexdigest()
+
+    level = [bytes.fromhex(leaf) for leaf in leaves]
+    while len(level) > 1:
+        if len(level) % 2:
+            level.append(level[-1])
+        level = [hashlib.sha256(level[i] + level[i + 1]).digest() for i in range(0, len(level), 2)]
+    return level[0].hex()
+
+
+def hash_and_build_tree(path: str, chunk_size: int) -> Tuple[str, Dict]:
+    # Uma só leitura do arquivo gera o hash do conteúdo e as folhas da árvore
+    digest = hashlib.sha256()
+    leaves = []
+    size = 0
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(chunk_size), b""):
+            digest.update(chunk)
+            leaves.append(chunk_hash(chunk))
+            size += len(chunk)
+
+    return digest.hexdigest(), {"chunk_size": chunk_size, "size": size, "leaves": leaves, "root": merkle_root(leaves)}
+
+
+def valid_tree(tree: Dict) -> bool:
+    try:
+        chunk_size, size, leaves = tree["chunk_size"], tree["size"], tree["leaves"]
+        return (
+            chunk_size > 0
+            and len(leaves) == (size + chunk_size - 1) // chunk_size
+            and merkle_root(leaves) == tree["root"]
+        )
+    except (KeyError, TypeError, ValueError):
+        return False
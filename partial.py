@@ -0,0 +1,124 @@
+import os
+import json
+import time
+import threading
+from typing import List
+
+PART_SUFFIX = ".part"
+STATE_SUFFIX = ".part.state"
+STATE_SAVE_INTERVAL = 1.0
+
+
+def is_partial(filename: str) -> bool:
+    return filename.endswith((PART_SUFFIX, STATE_SUFFIX, STATE_SUFFIX + ".tmp"))
+
+
+class PartialDownload:
+    def __init__(self, path: str, size: int, chunk_size: int, digest: str = None):
+        self.path = path
+        self.part_path = path + PART_SUFFIX
+        self.state_path = path + STATE_SUFFIX
+        self.size = size
+        self.chunk_size = chunk_size
+        self.digest = digest
+        self.total_chunks = (size + chunk_size - 1) // chunk_size
+        self.bitmap = bytearray((self.total_chunks + 7) // 8)
+        self.lock = threading.Lock()
+        self.last_save = 0.0
+        self.file = None
+
+    @classmethod
+    def open(cls, path: str, size: int, chunk_size: int, digest: str = None) -> "PartialDownload":
+        partial = cls(path, size, chunk_size, digest)
+        if not partial._load_state():
+            partial.bitmap = bytearray(len(partial.bitmap))
+            with open(partial.part_path, "wb") as f:
+                f.truncate(size)
+            partial._save_state()
+
+        partial.file = open(partial.part_path, "r+b")
+        return partial
+
+    def _load_state(self) -> bool:
+        # Sem hash não há como garantir que o .part é do mesmo conteúdo
+        if not self.digest:
+            return False
+
+        try:
+            with open(self.state_path) as f:
+                state = json.load(f)
+            if (state["hash"], state["size"], state["chunk_size"]) != (self.digest, self.size, self.chunk_size):
+                return False
+            if os.path.getsize(self.part_path) != self.size:
+                return False
+
+            bitmap = bytearray.fromhex(state["bitmap"])
+            if len(bitmap) != len(self.bitmap):
+                return False
+            self.bitmap = bitmap
+            return True
+        except (OSError, ValueError, KeyError, TypeError):
+            return False
+
+    def _save_state(self):
+        state = {"hash": self.digest, "size": self.size, "chunk_size": self.chunk_size, "bitmap": self.bitmap.hex()}
+        with open(self.state_path + ".tmp", "w") as f:
+            json.dump(state, f)
+        os.replace(self.state_path + ".tmp", self.state_path)
+        self.last_save = time.time()
+
+    def has(self, index: int) -> bool:
+        return bool(self.bitmap[index // 8] & (1 << (index % 8)))
+
+    def completed(self) -> int:
+        return sum(1 for index in range(self.total_chunks) if self.has(index))
+
+    def missing(self) -> List[int]:
+        return [index * self.chunk_size for index in range(self.total_chunks) if not self.has(index)]
+
+    def present(self) -> List[int]:
+        return [index * self.chunk_size for index in range(self.total_chunks) if self.has(index)]
+
+    def is_complete(self) -> bool:
+        return self.completed() == self.total_chunks
+
+    def write(self, offset: int, data: bytes):
+        index = offset // self.chunk_size
+        with self.lock:
+            self.file.seek(offset)
+            self.file.write(data)
+            self.bitmap[index // 8] |= 1 << (index % 8)
+            if time.time() - self.last_save > STATE_SAVE_INTERVAL:
+                self._flush()
+
+    def _flush(self):
+        # Os dados vão para o disco antes do bitmap que os marca como presentes
+        self.file.flush()
+        os.fsync(self.file.fileno())
+        self._save_state()
+
+    def close(self):
+        with self.lock:
+            if self.file is None:
+                return
+            try:
+                self._flush()
+            finally:
+                self.file.close()
+                self.file = None
+
+    def finish(self):
+        self.close()
+        os.replace(self.part_path, self.path)
+        os.remove(self.state_path)
+
+    def discard(self):
+        with self.lock:
+            if self.file is not None:
+                self.file.close()
+                self.file = None
+        for path in (self.part_path, self.state_path):
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
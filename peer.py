@@ -3,10 +3,34 @@ import time
 import random
 import threading
 import Pyro5.api
+import Pyro5.errors
+import Pyro5.callcontext
+import Pyro5.serializers
 import base64
-from typing import List, Dict, Set 
-
-Pyro5.config.SERIALIZER = "serpent"
+import uuid
+import json
+import hashlib
+import collections
+import functools
+import concurrent.futures
+from typing import Callable, List, Dict, Set, Union
+
+import merkle
+from admission import AdmissionControl
+import compression
+from data_channel import DataChannelClient, DataChannelServer, new_token
+from partial import PartialDownload, is_partial
+from pool import ProxyPool
+from scheduler import default_scheduler
+from tracker_index import FileIndex
+from watcher import FileWatcher
+
+SERIALIZERS = ("serpent", "marshal", "msgpack", "json")
+SERIALIZER = os.environ.get("P2P_SERIALIZER", "serpent")
+if SERIALIZER not in SERIALIZERS or SERIALIZER not in Pyro5.serializers.serializers:
+    raise ValueError(f"Serializador {SERIALIZER!r} indisponível; opções: {[s for s in SERIALIZERS if s in Pyro5.serializers.serializers]}")
+
+Pyro5.config.SERIALIZER = SERIALIZER
 Pyro5.config.THREADPOOL_SIZE = 16
 Pyro5.config.SERVERTYPE = "multiplex"
 Pyro5.config.DETAILED_TRACEBACK = True
@@ -18,83 +42,410 @@ logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(level
 
 DEFAULT_FILES_PATH = "files"
 
+TRANSFER_CHUNK_SIZE = 1024 * 1024
+TRANSFER_MAX_CHUNK_SIZE = 4 * 1024 * 1024
+TRANSFER_IDLE_TIMEOUT = 60.0
+
+HASH_BLOCK_SIZE = 1024 * 1024
+HASH_CACHE_FILE = "hashes.json"
+
+MERKLE_DIR = "merkle"
+MERKLE_MAX_RETRIES = 3
+MERKLE_BUILD_WORKERS = 1
+
+LINK_RATE_MIN_SAMPLE = 256 * 1024
+LINK_RATE_SMOOTHING = 0.5
+
+SWARM_MAX_SOURCES = 8
+SWARM_MAX_CORRUPT_CHUNKS = 3
+
+TRACKER_PREFIX = "Tracker_Epoca_"
+
+ELECTION_VOTE_TIMEOUT = 5.0
+ELECTION_DEADLINE = 2 * ELECTION_VOTE_TIMEOUT
+ELECTION_STOP_CHECK = 0.1
+ELECTION_MAX_WORKERS = 8
+
+HEARTBEAT_INTERVAL = 0.1
+HEARTBEAT_ROUND_DEADLINE = 0.08
+HEARTBEAT_SEND_TIMEOUT = 1.0
+HEARTBEAT_MAX_WORKERS = 16
+HEARTBEAT_SUSPECT_FAILURES = 3
+HEARTBEAT_SUSPECT_MAX_BACKOFF = 5.0
+
+MEMBERSHIP_REFRESH_INTERVAL = 5.0
+MAINTENANCE_INTERVAL = 10.0
+
+REPLICATION_MAX_CHANGES = 1000
+INDEX_PULL_JITTER_PER_PEER = 0.01
+INDEX_PULL_MAX_JITTER = 2.0
+
+REREGISTER_JITTER_PER_PEER = 0.01
+REREGISTER_MAX_JITTER = 2.0
+REREGISTER_BACKOFF_BASE = 0.2
+REREGISTER_BACKOFF_MAX = 5.0
+
+REGISTRATION_RATE = 50.0
+REGISTRATION_BURST = 10
+REGISTRATION_SMALL_DELTA = 100
+
+
+def _to_bytes(data) -> bytes:
+    if isinstance(data, dict) and data.get("encoding") == "base64":
+        return base64.b64decode(data["data"])
+    return bytes(data)
+
+
+def _wire_bytes(data: bytes):
+    # JSON não tem tipo binário; marshal e msgpack levam bytes crus e o serpent já codifica em base64 sozinho
+    if Pyro5.callcontext.current_context.serializer_id == Pyro5.serializers.serializers["json"].serializer_id:
+        return {"data": base64.b64encode(data).decode("ascii"), "encoding": "base64"}
+    return data
+
+
+def _wire_keys(mapping: Dict) -> Dict:
+    # json e msgpack só aceitam chaves str; quem recebe converte de volta com int()
+    return {str(key): value for key, value in mapping.items()}
+
+
+def _hash_file(path: str) -> str:
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(HASH_BLOCK_SIZE), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def _election_undecided(votes: int, total_peers: int, pending: int) -> bool:
+    if votes >= total_peers // 2 + 1:
+        return False
+    # Peers que falharem saem da contagem, então a vitória ainda é possível se algum
+    # cenário de respostas pendentes (concedidas ou falhas) alcançar a maioria
+    for granted in range(pending + 1):
+        if votes + granted >= (total_peers - (pending - granted)) // 2 + 1:
+            return True
+    return False
+
+
+def _drop_finished(in_flight: Dict[int, object]):
+    for peer_id in [peer_id for peer_id, future in in_flight.items() if future.done()]:
+        del in_flight[peer_id]
+
+
+class ElectionTally:
+    # Contagem de uma rodada de votos, comum às eleições em threads e em asyncio
+    def __init__(self, peer: "Peer", total_peers: int):
+        self.peer = peer
+        self.total_peers = total_peers
+        self.unreachable: Set[int] = set()
+        self.deadline = time.monotonic() + ELECTION_DEADLINE
+        # Estado da eleição em threads, dirigida pelos callbacks dos votos
+        self.lock = threading.Lock()
+        self.pending: Dict[concurrent.futures.Future, int] = {}
+        self.finished = False
+        self.timer = None
+
+    def undecided(self, pending: int) -> bool:
+        return _election_undecided(len(self.peer.votes_received), self.total_peers, pending)
+
+    def wait_timeout(self) -> float:
+        # Votos cancelados no stop() nunca completam: a espera acorda de tempos em tempos para notar o stop
+        return min(ELECTION_STOP_CHECK, self.deadline - time.monotonic())
+
+    def expire(self, peer_ids):
+        for peer_id in peer_ids:
+            self.peer.logger.warning(f"Peer {peer_id} não respondeu ao pedido de voto a tempo")
+            self.unreachable.add(peer_id)
+            self.total_peers -= 1
+
+    def record(self, peer_id: int, future):
+        try:
+            granted = future.result()
+        except Exception as e:
+            self.peer.logger.warning(f"Erro ao solicitar voto de peer.{peer_id}: {e!r}")
+            self.unreachable.add(peer_id)
+            self.total_peers -= 1
+            return
+
+        if granted:
+            self.peer.votes_received.add(peer_id)
+            self.peer.logger.info(f"Recebeu voto do peer {peer_id}")
+        else:
+            self.peer.logger.info(f"Peer {peer_id} negou o voto")
+
+    def abandon(self, pending):
+        for future in pending:
+            future.cancel()
+        if pending:
+            self.peer.logger.info(f"Eleição decidida sem aguardar {len(pending)} peers")
+
+
+class RegistrationDeferred(Exception):
+    def __init__(self, retry_after: float):
+        super().__init__(f"Tracker ocupado, tentar novamente em {retry_after:.2f}s")
+        self.retry_after = retry_after
+
+
+class TrackerResolver:
+    def __init__(self, logger: logging.Logger, pool: ProxyPool):
+        self.logger = logger
+        self.pool = pool
+        self.lock = threading.Lock()
+        self.epoch = 0
+        self.uri = None
+        self.uri_epoch = 0
+        self.lookups = 0
+
+    def notify_epoch(self, epoch: int):
+        with self.lock:
+            if epoch > self.epoch:
+                self.epoch = epoch
+            if self.uri is not None and self.uri_epoch < epoch:
+                self.logger.info(f"Nova época {epoch} detectada, descartando tracker em cache da época {self.uri_epoch}")
+                self.uri = None
+
+    def invalidate(self):
+        with self.lock:
+            self.uri = None
+
+    def resolve(self):
+        with self.lock:
+            if self.uri is not None:
+                return self.uri_epoch, self.uri
+            known_epoch = self.epoch
+
+        name_server = Pyro5.api.locate_ns()
+        self.lookups += 1
+
+        epoch, uri = known_epoch, None
+        if known_epoch:
+            try:
+                uri = name_server.lookup(f"{TRACKER_PREFIX}{known_epoch}")
+            except Pyro5.errors.NamingError:
+                uri = None
+
+        if uri is None:
+            trackers = [name for name in name_server.list(prefix=TRACKER_PREFIX).keys()]
+            if not trackers:
+                return 0, None
+
+            epoch = max([int(t.split("_")[-1]) for t in trackers])
+            uri = name_server.lookup(f"{TRACKER_PREFIX}{epoch}")
+
+        with self.lock:
+            self.uri = uri
+            self.uri_epoch = epoch
+            self.epoch = max(self.epoch, epoch)
+
+        return epoch, uri
+
+    def call(self, method: str, *args):
+        for attempt in range(2):
+            epoch, uri = self.resolve()
+            if uri is None:
+                raise Pyro5.errors.NamingError("Nenhum tracker registrado")
+
+            try:
+                return getattr(self.pool.get(uri), method)(*args)
+            except Pyro5.errors.CommunicationError:
+                self.pool.discard(uri)
+                self.invalidate()
+                if attempt:
+                    raise
+
+
 class Peer:
-    def __init__(self, peer_id: int, files_path: str = None):
+    def __init__(self, peer_id: int, files_path: str = None, host=None):
         self.peer_id = peer_id
+        # Com um host (PeerHost), daemon, canal de dados, pools e resolver são compartilhados entre os peers do processo
+        self.host = host
         self.logger = logging.getLogger(f"Peer-{peer_id}")
         self.files_path = files_path or os.path.join(DEFAULT_FILES_PATH, f"peer_{peer_id}")
 
+        self.meta_path = os.path.normpath(self.files_path) + ".meta"
+
         os.makedirs(self.files_path, exist_ok=True)
+        os.makedirs(self.meta_path, exist_ok=True)
 
         self.files: Set[str] = set()
+        self.file_meta: Dict[str, list] = self._load_hash_cache()
+        self.file_meta_lock = threading.Lock()
+        self.merkle_building: Set[str] = set()
+        self.merkle_lock = threading.Lock()
+        self.merkle_executor = host.merkle_executor if host else concurrent.futures.ThreadPoolExecutor(
+            max_workers=MERKLE_BUILD_WORKERS, thread_name_prefix=f"Peer-{peer_id}-merkle"
+        )
+        self.watcher = None
         self._scan_local_files()
 
-        self.tracker_uri = None
-        self.tracker_proxy = None
+        self.index_incarnation = uuid.uuid4().hex
+        self.acked_version = None
+        self.acked_files: Dict[str, str] = {}
+        self.registered_epoch = 0
+        self.registration_lock = threading.Lock()
+        self.reregister_lock = threading.Lock()
+        self.reregister_timer = None
+        self.reregister_attempt = 0
+        self.admission = AdmissionControl(REGISTRATION_RATE, REGISTRATION_BURST)
+
+        # O agendador em threads só nasce no start: o AsyncPeer usa o loop asyncio no lugar dele
+        self.scheduler = host.scheduler if host else None
+        self.maintenance_task = None
+        self.pool = host.pool if host else ProxyPool()
+        self.resolver = host.resolver if host else TrackerResolver(self.logger, self.pool)
         self.current_epoch = 0
 
         self.is_tracker = False
         self.voted_for_epoch = 0
+        self.voted_at = 0.0
         self.votes_received = set()
         self.election_in_progress = False
+        self.election_executor = host.election_executor if host else concurrent.futures.ThreadPoolExecutor(
+            max_workers=ELECTION_MAX_WORKERS, thread_name_prefix=f"Peer-{peer_id}-election"
+        )
 
         self.tracker_timeout = random.randint(150, 300) / 1000
         self.last_heartbeat = 0
         self.succedded_heartbeat = False
         self.heartbeat_timer = None
+        self.heartbeat_task = None
+        self.heartbeat_lock = threading.Lock()
+        self.heartbeat_health: Dict[int, dict] = {}
+        self.heartbeat_executor = host.heartbeat_executor if host else concurrent.futures.ThreadPoolExecutor(
+            max_workers=HEARTBEAT_MAX_WORKERS, thread_name_prefix=f"Peer-{peer_id}-heartbeat"
+        )
+
+        self.file_index = FileIndex()
+        self.network_index = FileIndex()
+        self.index_pull_lock = threading.Lock()
+
+        self.uri = None
+        self.stopped = False
+        self.members: Dict[int, str] = {}
+        self.members_version = 0
+        self.members_refreshed = 0.0
+        self.members_lock = threading.Lock()
+
+        self.transfers: Dict[str, dict] = {}
+        self.transfers_lock = threading.Lock()
+        self.data_tokens: Dict[str, str] = {}
+        self.data_channel = None
+
+        self.compression_profiles: Dict[tuple, dict] = {}
+        self.link_rates: Dict[str, float] = {}
+        self.received_stats = {"bytes_received": 0, "bytes_raw": 0}
+        self.link_lock = threading.Lock()
 
         self.logger.info(f"Peer {peer_id} iniciado. Arquivos em: {self.files_path}")
         self.logger.info(f"Arquivos locais: {self.files}")
 
 
+    @property
+    def tracker_uri(self):
+        return self.resolver.uri
+
+
     @Pyro5.api.expose
-    def heartbeat(self, epoch: int) -> bool:
+    def heartbeat(self, epoch: int, members: Dict[int, str] = None, index: Dict = None) -> bool:
         self.is_tracker = False
+        # False também quando o índice enviado não foi aplicado, para o tracker não avançar a posição confirmada
+        index_applied = True
+        if epoch >= self.current_epoch and members is not None:
+            with self.members_lock:
+                self.members = {int(peer_id): uri for peer_id, uri in members.items()}
+        if epoch >= self.current_epoch and index is not None:
+            index_applied = self._apply_replicated_index(index)
+
         if epoch > self.current_epoch:
 
             self.logger.info(f"Detected new tracker with epoch {epoch}, re-registering files")
             self.current_epoch = epoch
             self.last_heartbeat = time.time()
+            self.resolver.notify_epoch(epoch)
 
-            self._register_files_with_tracker()
+            # Fora do caminho do heartbeat e com atraso aleatório, para não chegarem todos juntos ao novo tracker
+            self._schedule_reregistration()
 
             self._reset_tracker_timer()
             self.succedded_heartbeat = True
-            return True
+            return index_applied
         elif epoch == self.current_epoch:
             self.last_heartbeat = time.time()
 
             self._reset_tracker_timer()
             self.succedded_heartbeat = True
-            return True
+            return index_applied
         self.succedded_heartbeat = False
         return False
 
 
-    def _reset_tracker_timer(self):
+    def _apply_replicated_index(self, index: Dict) -> bool:
+        if index.get("pull"):
+            applied = self.network_index.position() == (index["index_id"], index["version"])
+        else:
+            applied = self.network_index.apply_changes(index)
+        if not applied:
+            self._schedule_index_pull()
+        return applied
+
+    def _schedule_index_pull(self):
+        # Diffs grandes ou fora de sequência não vêm no heartbeat: a réplica busca o índice por conta própria
+        if not self.index_pull_lock.acquire(blocking=False):
+            return
 
-        if self.heartbeat_timer:
-            self.heartbeat_timer.cancel()
+        def pull():
+            try:
+                self._sync_network_index()
+            except Exception as e:
+                self.logger.warning(f"Erro ao sincronizar réplica do índice: {e}")
+            finally:
+                self.index_pull_lock.release()
+
+        # Após uma troca de tracker muitas réplicas ficam para trás ao mesmo tempo: espalha as buscas
+        with self.members_lock:
+            spread = min(INDEX_PULL_MAX_JITTER, INDEX_PULL_JITTER_PER_PEER * max(1, len(self.members)))
+        self.scheduler.call_later(random.uniform(0, spread), pull)
+
+    def _sync_network_index(self):
+        index_id, version = self.network_index.position()
+        changes = self.resolver.call("get_file_index_since", version, index_id)
+        if changes:
+            self.network_index.apply_changes(changes)
+
+    def _reset_tracker_timer(self):
+        if self.stopped:
+            return
 
         self.tracker_timeout = random.randint(150, 300) / 1000
-        self.heartbeat_timer = threading.Timer(self.tracker_timeout, self._check_tracker_status)
-        self.heartbeat_timer.daemon = True
-        self.heartbeat_timer.start()
+        self.heartbeat_timer = self.scheduler.reschedule(self.heartbeat_timer, self.tracker_timeout, self._check_tracker_status)
 
 
     def _check_tracker_status(self):
+        if self.stopped:
+            return
+
         current_time = time.time()
         if current_time - self.last_heartbeat > self.tracker_timeout:
             self.logger.info(f"Timeout do tracker detectado. Último heartbeat há {current_time - self.last_heartbeat:.2f}s")
+            # O ping pode levar até o COMMTIMEOUT: fica fora das threads do agendador
+            self._submit_election(self._probe_tracker)
 
-            try:
-                if self.tracker_proxy:
-                    self.tracker_proxy.ping()
-                    self._reset_tracker_timer()
-                    return
-            except Exception:
-                self.logger.info("Tracker não responde. Iniciando eleição.")
-                self.start_election()
+    def _probe_tracker(self):
+        try:
+            self.resolver.call("ping")
+            self._reset_tracker_timer()
+            return
+        except Exception:
+            pass
+
+        # Quem já votou num candidato espera o resultado em vez de abrir uma eleição concorrente
+        if self.voted_for_epoch > self.current_epoch and time.time() - self.voted_at < ELECTION_DEADLINE:
+            self.logger.info(f"Tracker não responde, mas a eleição da época {self.voted_for_epoch} está em andamento")
+            self._reset_tracker_timer()
+            return
+
+        self.logger.info("Tracker não responde. Iniciando eleição.")
+        self.start_election()
 
 
     def start_election(self):
@@ -102,86 +453,181 @@ class Peer:
             self.logger.info("Eleição já em andamento, ignorando nova solicitação")
             return
 
-        new_epoch = self.current_epoch + 1
+        # Épocas em que este peer já votou estão comprometidas: um novo pedido de votos usa a seguinte
+        new_epoch = max(self.current_epoch, self.voted_for_epoch) + 1
         self.logger.info(f"Iniciando eleição para época {new_epoch}")
 
         self.election_in_progress = True
         self.votes_received = {self.peer_id}
 
         delay = random.uniform(0.5, 2.0) * 0.5
-        time.sleep(delay)
+        self.scheduler.call_later(delay, self._begin_election, new_epoch)
 
-        try:
-            name_server = Pyro5.api.locate_ns()
-            peers = {name: uri for name, uri in name_server.list(prefix="peer.").items()}
+    def _begin_election(self, new_epoch: int):
+        # O agendador só dispara timers; a eleição e seus acessos ao serviço de nomes rodam no executor de eleição
+        if self._claim_candidacy(new_epoch):
+            self._submit_election(self._run_election, new_epoch)
 
-            self.logger.info(f"Encontrados {len(peers)} peers no serviço de nomes")
+    def _claim_candidacy(self, new_epoch: int) -> bool:
+        if self.stopped:
+            self.election_in_progress = False
+            return False
+
+        # Durante a espera aleatória outro candidato pode ter pedido o voto deste peer: espera o resultado dele
+        if self.voted_for_epoch >= new_epoch or self.current_epoch >= new_epoch:
+            self.logger.info(f"Eleição da época {new_epoch} já disputada por outro peer, aguardando o resultado")
+            self.election_in_progress = False
+            self._reset_tracker_timer()
+            return False
+
+        self.voted_for_epoch = new_epoch
+        self.voted_at = time.time()
+        return True
+
+    def _election_superseded(self, new_epoch: int) -> bool:
+        return self.stopped or self.current_epoch >= new_epoch
+
+    def _submit_election(self, function: Callable, *args):
+        try:
+            self.election_executor.submit(function, *args)
+        except RuntimeError:
+            self.election_in_progress = False
 
-            total_peers = len(peers)
+    def _run_election(self, new_epoch: int):
+        try:
+            peers = self._election_peers()
+            tally = ElectionTally(self, len(peers))
 
-            for peer_name, uri in peers.items():
-                peer_id = int(peer_name.split(".")[1])
+            for peer_id, uri in peers.items():
                 if peer_id != self.peer_id:
-                    try:
-                        peer_proxy = Pyro5.api.Proxy(uri)
-                        peer_proxy._pyroTimeout = 5.0
-                        self.logger.info(f"Solicitando voto do peer {peer_id}")
-                        vote_granted = peer_proxy.request_vote(self.peer_id, new_epoch)
-                        if vote_granted:
-                            self.votes_received.add(peer_id)
-                            self.logger.info(f"Recebeu voto do peer {peer_id}")
-                        else:
-                            self.logger.info(f"Peer {peer_id} negou o voto")
-                    except Exception as e:
-                        self.logger.warning(f"Erro ao solicitar voto de {peer_name}: {e}")
-                        total_peers -= 1
-
-            votes_needed = total_peers // 2 + 1
-
-            if len(self.votes_received) >= votes_needed:
-                self.logger.info(f"Eleição vencida com {len(self.votes_received)} votos de {total_peers} peers")
-                self._become_tracker(new_epoch)
-            else:
-                self.logger.info(f"Eleição perdida. Recebeu {len(self.votes_received)} votos, mas precisa de >{total_peers//2}")
-                self.election_in_progress = False
+                    self.logger.info(f"Solicitando voto do peer {peer_id}")
+                    tally.pending[self.election_executor.submit(self._request_vote_from, uri, new_epoch)] = peer_id
 
-                retry_delay = random.uniform(0.5, 2.0)
-                self.logger.info(f"Aguardando {retry_delay:.2f}s antes de considerar nova eleição")
-                time.sleep(retry_delay)
+            # Nenhuma thread fica parada esperando votos: cada resposta é contada ao chegar e o prazo é um timer
+            tally.timer = self.scheduler.call_later(ELECTION_DEADLINE, self._submit_election,
+                                                    self._decide_election, tally, new_epoch, True)
+            for future in list(tally.pending):
+                future.add_done_callback(functools.partial(self._on_vote, tally, new_epoch))
+            self._decide_election(tally, new_epoch)
 
         except Exception as e:
-            self.logger.error(f"Erro durante eleição: {e}")
+            self._election_failed(e)
+
+    def _on_vote(self, tally: ElectionTally, new_epoch: int, future: concurrent.futures.Future):
+        with tally.lock:
+            peer_id = tally.pending.pop(future, None)
+            if peer_id is None or tally.finished:
+                return
+            # Cancelados só no stop(), que _decide_election trata
+            if not future.cancelled():
+                tally.record(peer_id, future)
+        self._decide_election(tally, new_epoch)
+
+    def _decide_election(self, tally: ElectionTally, new_epoch: int, expired: bool = False):
+        with tally.lock:
+            if tally.finished:
+                return
+            if expired:
+                tally.expire(list(tally.pending.values()))
+            elif tally.pending and not self._election_superseded(new_epoch) and tally.undecided(len(tally.pending)):
+                return
+            tally.finished = True
+            pending = list(tally.pending)
+            tally.pending.clear()
+
+        if tally.timer:
+            self.scheduler.cancel(tally.timer)
+        tally.abandon(pending)
+
+        # Parado, ou outro peer já venceu esta época e mandou heartbeat
+        if self._election_superseded(new_epoch):
             self.election_in_progress = False
+            return
 
-            self._reset_tracker_timer()
+        try:
+            if self._election_won(tally.total_peers):
+                self._become_tracker(new_epoch, tally.unreachable)
+        except Exception as e:
+            self._election_failed(e)
 
+    def _election_peers(self) -> Dict[int, str]:
+        with self.members_lock:
+            peers = dict(self.members)
+
+        if peers:
+            self.logger.info(f"Usando {len(peers)} peers da lista de membros do último tracker")
+        else:
+            peers = self._members_from_name_server()
+            self.logger.info(f"Encontrados {len(peers)} peers no serviço de nomes")
+        return peers
+
+    def _election_won(self, total_peers: int) -> bool:
+        votes_needed = total_peers // 2 + 1
+
+        if len(self.votes_received) >= votes_needed:
+            self.logger.info(f"Eleição vencida com {len(self.votes_received)} votos de {total_peers} peers")
+            return True
+
+        self.logger.info(f"Eleição perdida. Recebeu {len(self.votes_received)} votos, mas precisa de >{total_peers//2}")
+        self.election_in_progress = False
+        # O voto em si mesmo não deve segurar a próxima tentativa como se outra eleição estivesse em andamento
+        self.voted_at = 0.0
+
+        retry_delay = random.uniform(0.5, 2.0)
+        self.logger.info(f"Aguardando {retry_delay:.2f}s antes de considerar nova eleição")
+        self.scheduler.call_later(retry_delay, self._reset_tracker_timer)
+        return False
+
+    def _election_failed(self, error: Exception):
+        self.logger.error(f"Erro durante eleição: {error}")
+        self.election_in_progress = False
+
+        self._reset_tracker_timer()
+
+
+    def _request_vote_from(self, uri, new_epoch: int) -> bool:
+        with self.pool.lease(uri, timeout=ELECTION_VOTE_TIMEOUT) as proxy:
+            return proxy.request_vote(self.peer_id, new_epoch)
+
+
+    def _become_tracker(self, epoch: int, unreachable: Set[int] = ()):
+        # A réplica recebida do tracker anterior vira o índice: seguidores na mesma posição continuam com diffs
+        self.network_index.fork()
+        self.file_index = self.network_index
+        self.network_index = FileIndex()
+        stats = self.file_index.stats()
+        self.logger.info(f"Assumindo índice replicado com {stats['files']} arquivos de {stats['peers']} peers")
 
-    def _become_tracker(self, epoch: int):
         self.current_epoch = epoch
         self.is_tracker = True
         self.election_in_progress = False
+        self.resolver.notify_epoch(epoch)
 
         try:
-            tracker_name = f"Tracker_Epoca_{epoch}"
+            tracker_name = f"{TRACKER_PREFIX}{epoch}"
             self.logger.info(f"Registrando-se como {tracker_name}")
             name_server = Pyro5.api.locate_ns()
 
-            old_trackers = [name for name in name_server.list().keys() if name.startswith("Tracker_Epoca_")]
+            old_trackers = [name for name in name_server.list(prefix=TRACKER_PREFIX).keys()]
             for old_name in old_trackers:
                 try:
                     name_server.remove(old_name)
                 except Exception as e:
                     self.logger.warning(f"Erro ao remover tracker antigo {old_name}: {e}")
 
-            if not hasattr(self, 'file_index'):
-                self.file_index = {}
-            self.file_index[self.peer_id] = self.files
+            self._refresh_members(name_server)
+            self._add_member(self.peer_id, self.uri)
 
             uri = self._pyroDaemon.uriFor(self)
             name_server.register(tracker_name, uri)
             self.logger.info(f"Registrado como {tracker_name} com URI {uri}")
 
-            self._start_heartbeat_thread(epoch)
+            # Só os peers que não votaram saem do índice, já com o tracker visível no serviço de nomes
+            for peer_id in unreachable:
+                self.file_index.drop_peer(peer_id)
+            self.file_index.set_peer_files(self.peer_id, self.files, metadata=self._local_metadata(self.files))
+
+            self._start_heartbeat_task(epoch)
         except Exception as e:
             self.logger.error(f"Erro ao registrar-se como tracker: {e}")
             self.is_tracker = False
@@ -194,42 +640,295 @@ class Peer:
         if new_epoch > self.current_epoch and self.voted_for_epoch != new_epoch:
             self.logger.info(f"Concedendo voto para peer {candidate_id} na época {new_epoch}")
             self.voted_for_epoch = new_epoch
+            self.voted_at = time.time()
             return True
         else:
             self.logger.info(f"Negando voto para peer {candidate_id}. Época atual: {self.current_epoch}, Última época votada: {self.voted_for_epoch}")
             return False
 
 
-    def _start_heartbeat_thread(self, epoch: int):
+    def _start_heartbeat_task(self, epoch: int):
+        self._reset_heartbeat_rounds()
+        in_flight = {}
+        refresh = []
+
         def send_heartbeats():
-            while self.is_tracker:
-                try:
-                    name_server = Pyro5.api.locate_ns()
-                    peers = {name: uri for name, uri in name_server.list(prefix="peer.").items()}
+            if not self._heartbeat_round_active(epoch):
+                self.scheduler.cancel(task)
+                return
+
+            # A rodada só despacha envios: peers lentos continuam em andamento e são pulados até responderem,
+            # e nenhuma thread do agendador (compartilhado entre os peers de um host) fica bloqueada
+            try:
+                _drop_finished(in_flight)
+                if self._members_stale() and not (refresh and not refresh[0].done()):
+                    refresh[:] = [self.heartbeat_executor.submit(self._refresh_members)]
+
+                for peer_id, uri in self._heartbeat_targets(in_flight).items():
+                    in_flight[peer_id] = self.heartbeat_executor.submit(self._send_heartbeat, peer_id, uri, epoch)
+            except Exception:
+                pass
+
+        task = self.scheduler.call_every(HEARTBEAT_INTERVAL, send_heartbeats, first_delay=0)
+        self.heartbeat_task = task
+
+    def _reset_heartbeat_rounds(self):
+        with self.heartbeat_lock:
+            self.heartbeat_health = {}
+
+        if self.heartbeat_task:
+            self.scheduler.cancel(self.heartbeat_task)
+
+    def _heartbeat_round_active(self, epoch: int) -> bool:
+        return self.is_tracker and not self.stopped and self.current_epoch == epoch
+
+    def _members_stale(self) -> bool:
+        return time.time() - self.members_refreshed > MEMBERSHIP_REFRESH_INTERVAL
+
+    def _heartbeat_targets(self, in_flight: Dict[int, object]) -> Dict[int, str]:
+        now = time.time()
+        with self.members_lock:
+            peers = dict(self.members)
+        return {
+            peer_id: uri for peer_id, uri in peers.items()
+            if peer_id != self.peer_id and peer_id not in in_flight and not self._is_heartbeat_suspect(peer_id, now)
+        }
+
+    def _send_heartbeat(self, peer_id: int, uri, epoch: int):
+        start = time.time()
 
-                    for peer_name, uri in peers.items():
-                        peer_id = int(peer_name.split(".")[1])
-                        if peer_id != self.peer_id:
-                            try:
-                                peer_proxy = Pyro5.api.Proxy(uri)
-                                peer_proxy.heartbeat(epoch)
-                            except Exception:
-                                pass
-                except Exception:
-                    pass
+        with self.heartbeat_lock:
+            health = self.heartbeat_health.get(peer_id)
+            acked_version = health.get("members_version", 0) if health else 0
 
-                time.sleep(0.1)
+        with self.members_lock:
+            version = self.members_version
+            members = dict(self.members) if acked_version != version else None
 
-        heartbeat_thread = threading.Thread(target=send_heartbeats, daemon=True)
-        heartbeat_thread.start()
+        index = self._replication_payload(health)
+
+        try:
+            with self.pool.lease(uri, timeout=HEARTBEAT_SEND_TIMEOUT) as proxy:
+                index_applied = proxy.heartbeat(epoch, _wire_keys(members) if members is not None else None, index)
+        except Exception:
+            self._record_heartbeat(peer_id, None)
+        else:
+            # Índice rejeitado: a posição confirmada fica onde estava e o próximo heartbeat reenvia a partir dela
+            position = (index["index_id"], index["version"]) if index and index_applied else None
+            self._record_heartbeat(peer_id, time.time() - start, version, position)
+
+    def _replication_payload(self, health: Dict) -> Dict:
+        # Sem confirmação ainda (tracker recém-eleito), supõe o seguidor na posição de onde este índice partiu
+        acked = health.get("index_position") if health else None
+        acked = acked or self.file_index.parent
+        position = self.file_index.position()
+        if acked == position:
+            return None
+
+        changes = self.file_index.changes_since(acked[1], acked[0], REPLICATION_MAX_CHANGES) if acked else None
+        if changes is None:
+            return {"index_id": position[0], "version": position[1], "pull": True}
+        return changes
+
+    def _record_heartbeat(self, peer_id: int, latency: float, members_version: int = 0, index_position: tuple = None):
+        with self.heartbeat_lock:
+            health = self.heartbeat_health.setdefault(peer_id, {"latency": 0.0, "failures": 0, "suspect_until": 0.0})
+
+            if latency is None:
+                health["failures"] += 1
+                strikes = health["failures"] - HEARTBEAT_SUSPECT_FAILURES
+                if strikes >= 0:
+                    backoff = min(HEARTBEAT_SUSPECT_MAX_BACKOFF, HEARTBEAT_INTERVAL * 2 ** (strikes + 1))
+                    health["suspect_until"] = time.time() + backoff
+                    if strikes == 0:
+                        self.logger.warning(f"Peer {peer_id} marcado como suspeito após {health['failures']} heartbeats sem resposta")
+                return
+
+            if health["failures"] >= HEARTBEAT_SUSPECT_FAILURES:
+                self.logger.info(f"Peer {peer_id} voltou a responder heartbeats")
+            health["failures"] = 0
+            health["suspect_until"] = 0.0
+            health["members_version"] = members_version
+            if index_position is not None:
+                health["index_position"] = index_position
+            health["latency"] = latency if not health["latency"] else 0.8 * health["latency"] + 0.2 * latency
+
+    def _is_heartbeat_suspect(self, peer_id: int, now: float) -> bool:
+        with self.heartbeat_lock:
+            health = self.heartbeat_health.get(peer_id)
+            return health is not None and health["suspect_until"] > now
+
+    def _members_from_name_server(self, name_server=None) -> Dict[int, str]:
+        name_server = name_server or Pyro5.api.locate_ns()
+        return {int(name.split(".")[1]): uri for name, uri in name_server.list(prefix="peer.").items()}
+
+    def _refresh_members(self, name_server=None):
+        try:
+            members = self._members_from_name_server(name_server)
+        except Exception as e:
+            self.logger.warning(f"Erro ao atualizar lista de membros pelo serviço de nomes: {e}")
+            return
+        finally:
+            self.members_refreshed = time.time()
+
+        with self.members_lock:
+            members = {peer_id: str(uri) for peer_id, uri in members.items()}
+            if members != self.members:
+                self.members = members
+                self.members_version += 1
+
+    def _add_member(self, peer_id: int, uri):
+        if uri is None:
+            return
+
+        with self.members_lock:
+            if self.members.get(peer_id) != str(uri):
+                self.members[peer_id] = str(uri)
+                self.members_version += 1
+
+    def _remove_member(self, peer_id: int):
+        with self.members_lock:
+            if self.members.pop(peer_id, None) is not None:
+                self.members_version += 1
+
+    @Pyro5.api.expose
+    def join(self, peer_id: int, uri: str) -> bool:
+        if not self.is_tracker:
+            return False
+
+        self.logger.info(f"Peer {peer_id} entrou na rede com URI {uri}")
+        self._add_member(peer_id, uri)
+        return True
+
+    @Pyro5.api.expose
+    def leave(self, peer_id: int) -> bool:
+        if not self.is_tracker:
+            return False
+
+        self.logger.info(f"Peer {peer_id} saiu da rede")
+        self._remove_member(peer_id)
+
+        self.file_index.drop_peer(peer_id)
+        return True
 
     def _scan_local_files(self):
         try:
-            files = os.listdir(self.files_path)
-            self.files = set(files)
+            files = set()
+            changed = False
+            for entry in os.scandir(self.files_path):
+                if not entry.is_file() or is_partial(entry.name):
+                    continue
+                files.add(entry.name)
+                changed |= self._update_file_meta(entry.name, entry.stat())
+
+            with self.file_meta_lock:
+                for filename in set(self.file_meta) - files:
+                    del self.file_meta[filename]
+                    changed = True
+
+            self.files = files
+            if changed:
+                self._save_hash_cache()
         except Exception as e:
             self.logger.error(f"Erro ao escanear arquivos locais: {e}")
 
+    def _on_local_changes(self, changed: Set[str], removed: Set[str]):
+        added, dropped = [], []
+        for filename in changed:
+            try:
+                is_new = filename not in self.files
+                if self._update_file_meta(filename) or is_new:
+                    added.append(filename)
+                self.files.add(filename)
+            except FileNotFoundError:
+                removed = removed | {filename}
+
+        for filename in removed:
+            # add_file/remove_file já atualizaram o estado; só o que mudou por fora do peer é publicado
+            if filename in self.files and not os.path.exists(os.path.join(self.files_path, filename)):
+                self.files.discard(filename)
+                with self.file_meta_lock:
+                    self.file_meta.pop(filename, None)
+                dropped.append(filename)
+
+        if not added and not dropped:
+            return
+
+        self.logger.info(f"Mudanças locais detectadas: {len(added)} novos ou alterados, {len(dropped)} removidos")
+        self._save_hash_cache()
+        try:
+            self._publish_local_changes(added, dropped)
+        except Exception as e:
+            self.logger.warning(f"Erro ao enviar mudanças locais ao tracker: {e}")
+
+    def _rescan_local_files(self):
+        self._scan_local_files()
+        if self.is_tracker:
+            self.file_index.set_peer_files(self.peer_id, self.files, metadata=self._local_metadata(self.files))
+        else:
+            self._push_index()
+
+    def _publish_local_changes(self, added: List[str], removed: List[str]):
+        if not self.is_tracker:
+            try:
+                self._push_index()
+            except Exception as e:
+                self.logger.warning(f"Registro adiado: {e}")
+                self._schedule_reregistration(e.retry_after if isinstance(e, RegistrationDeferred) else None)
+            return
+
+        for filename in removed:
+            self.file_index.remove(self.peer_id, filename)
+        for filename in added:
+            self.file_index.add(self.peer_id, filename, self._local_metadata([filename]))
+
+    def _update_file_meta(self, filename: str, stat: os.stat_result = None, digest: str = None) -> bool:
+        path = os.path.join(self.files_path, filename)
+        stat = stat or os.stat(path)
+
+        with self.file_meta_lock:
+            cached = self.file_meta.get(filename)
+        if digest is None and cached and cached[0] == stat.st_size and cached[1] == stat.st_mtime_ns:
+            return False
+
+        if digest is None:
+            # O hash e a árvore de Merkle saem da mesma leitura, fora do caminho das RPCs
+            digest, tree = merkle.hash_and_build_tree(path, TRANSFER_CHUNK_SIZE)
+            self._save_merkle_tree(digest, tree)
+        with self.file_meta_lock:
+            self.file_meta[filename] = [stat.st_size, stat.st_mtime_ns, digest]
+        return True
+
+    def _file_digest(self, filename: str) -> str:
+        with self.file_meta_lock:
+            cached = self.file_meta.get(filename)
+        return cached[2] if cached else None
+
+    def _local_metadata(self, filenames) -> Dict[str, list]:
+        with self.file_meta_lock:
+            return {name: [self.file_meta[name][2], self.file_meta[name][0]] for name in filenames if name in self.file_meta}
+
+    def _load_hash_cache(self) -> Dict[str, list]:
+        try:
+            with open(os.path.join(self.meta_path, HASH_CACHE_FILE)) as f:
+                return json.load(f)
+        except FileNotFoundError:
+            return {}
+        except Exception as e:
+            self.logger.warning(f"Cache de hashes inválido, recalculando: {e}")
+            return {}
+
+    def _save_hash_cache(self):
+        path = os.path.join(self.meta_path, HASH_CACHE_FILE)
+        try:
+            with self.file_meta_lock:
+                data = json.dumps(self.file_meta)
+            with open(path + ".tmp", "w") as f:
+                f.write(data)
+            os.replace(path + ".tmp", path)
+        except Exception as e:
+            self.logger.warning(f"Erro ao salvar cache de hashes: {e}")
+
 
     def register_with_name_server(self):
         try:
@@ -246,23 +945,21 @@ class Peer:
 
     def find_and_register_with_tracker(self):
       try:
-          name_server = Pyro5.api.locate_ns()
+          max_epoch, tracker_uri = self.resolver.resolve()
 
-          trackers = [name for name in name_server.list().keys() if name.startswith("Tracker_Epoca_")]
-
-          if not trackers:
+          if tracker_uri is None:
               self.logger.info("Nenhum tracker encontrado. Iniciando eleição.")
               self.start_election()
               return False
 
-          max_epoch = max([int(t.split("_")[-1]) for t in trackers])
-          tracker_name = f"Tracker_Epoca_{max_epoch}"
-          self.tracker_uri = name_server.lookup(tracker_name)
-          self.tracker_proxy = Pyro5.api.Proxy(self.tracker_uri)
           self.current_epoch = max_epoch
 
           self.logger.info(f"Encontrou tracker na época {max_epoch}")
 
+          # Entra na lista de membros antes do registro, que pode ser adiado pelo controle de admissão
+          if not self.resolver.call("join", self.peer_id, str(self.uri)):
+              self.logger.warning("Tracker recusou a entrada na rede")
+
           self._register_files_with_tracker()
 
           self.last_heartbeat = time.time()
@@ -279,49 +976,138 @@ class Peer:
 
 
     def _register_files_with_tracker(self):
-      if not self.tracker_proxy:
-          name_server = Pyro5.api.locate_ns()
-          trackers = [name for name in name_server.list().keys() if name.startswith("Tracker_Epoca_")]
-          max_epoch = max([int(t.split("_")[-1]) for t in trackers])
-          tracker_name = f"Tracker_Epoca_{max_epoch}"
-          self.tracker_uri = name_server.lookup(tracker_name)
-          self.tracker_proxy = Pyro5.api.Proxy(self.tracker_uri)
-          self.current_epoch = max_epoch
-
       try:
-          self._scan_local_files()
-
-          name_server = Pyro5.api.locate_ns()
-          trackers = [name for name in name_server.list().keys() if name.startswith("Tracker_Epoca_")]
-
-          if not trackers:
-              self.logger.error("Nenhum tracker registrado")
-              return False
-
-          max_epoch = max([int(t.split("_")[-1]) for t in trackers])
-          tracker_name = f"Tracker_Epoca_{max_epoch}"
-          tracker_uri = name_server.lookup(tracker_name)
-
-          tracker_proxy = Pyro5.api.Proxy(tracker_uri)
+          if self.watcher is None:
+              self._scan_local_files()
 
-          result = tracker_proxy.register_files(self.peer_id, list(self.files))
+          result = self._push_index()
           self.logger.info(f"Arquivos registrados com o tracker: {result}")
           return result
-      
+
+      except RegistrationDeferred as e:
+          self.logger.info(str(e))
+          self._schedule_reregistration(e.retry_after, force=True)
+          return False
       except Exception as e:
           self.logger.error(f"Erro ao registrar arquivos com tracker: {e}")
           return False
 
+    def _push_index(self) -> bool:
+        with self.registration_lock:
+            files = {filename: self._file_digest(filename) for filename in list(self.files)}
+
+            if self.acked_version is not None:
+                added = [filename for filename, digest in files.items() if self.acked_files.get(filename, False) != digest]
+                removed = [filename for filename in self.acked_files if filename not in files]
+                version = self.acked_version + (1 if added or removed else 0)
+
+                result = self.resolver.call("register_delta", self.peer_id, self.index_incarnation, self.acked_version,
+                                            version, added, removed, str(self.uri), self._local_metadata(added))
+                if isinstance(result, dict):
+                    raise RegistrationDeferred(result["retry_after"])
+                if result:
+                    self.acked_version = version
+                    self.acked_files = files
+                    self.registered_epoch = self.current_epoch
+                    return True
+
+                self.logger.info(f"Versão do índice divergente no tracker, enviando lista completa de {len(files)} arquivos")
+
+            version = (self.acked_version or 0) + 1
+            result = self.resolver.call("register_files", self.peer_id, list(files), str(self.uri),
+                                        self.index_incarnation, version, self._local_metadata(files))
+            if isinstance(result, dict):
+                raise RegistrationDeferred(result["retry_after"])
+            if result:
+                self.acked_version = version
+                self.acked_files = files
+                self.registered_epoch = self.current_epoch
+            return result
+
+    def _schedule_reregistration(self, delay: float = None, force: bool = False):
+        if delay is None:
+            with self.members_lock:
+                spread = min(REREGISTER_MAX_JITTER, REREGISTER_JITTER_PER_PEER * max(1, len(self.members)))
+            delay = random.uniform(0, spread)
+
+        with self.reregister_lock:
+            if self.stopped:
+                return
+            timer = self.reregister_timer
+            # Um pedido de "tente depois" do tracker prevalece sobre um agendamento anterior mais cedo
+            if force or timer is None or time.monotonic() + delay < timer.due:
+                self.reregister_timer = self.scheduler.reschedule(timer, delay, self._reregister)
+
+    def _reregister(self):
+        with self.reregister_lock:
+            self.reregister_timer = None
+
+        if self.stopped or self.is_tracker:
+            self.reregister_attempt = 0
+            return
+
+        try:
+            if self._push_index():
+                if self.reregister_attempt:
+                    self.logger.info(f"Arquivos registrados com o tracker após {self.reregister_attempt + 1} tentativas")
+                self.reregister_attempt = 0
+                return
+        except RegistrationDeferred as e:
+            self._schedule_reregistration(e.retry_after, force=True)
+            return
+        except Exception as e:
+            self.logger.warning(f"Erro ao registrar arquivos com tracker: {e}")
+
+        self.reregister_attempt += 1
+        backoff = min(REREGISTER_BACKOFF_MAX, REREGISTER_BACKOFF_BASE * 2 ** self.reregister_attempt)
+        self._schedule_reregistration(random.uniform(0, backoff))
+
+    def _maintenance(self):
+        self._close_idle_transfers()
+        self.pool.evict_idle()
+
     @Pyro5.api.expose
-    def register_files(self, peer_id: int, files: List[str]) -> bool:
+    def register_files(self, peer_id: int, files: List[str], uri: str = None, incarnation: str = None,
+                       version: int = None, metadata: Dict[str, list] = None) -> Union[bool, Dict]:
         if not self.is_tracker:
             return False
 
+        retry_after = self.admission.try_admit(peer_id)
+        if retry_after is not None:
+            return {"retry_after": retry_after}
+
         self.logger.info(f"Registrando {len(files)} arquivos para peer {peer_id}")
 
-        self.file_index[peer_id] = set(files)
+        self._note_registration(peer_id, uri)
+        self.file_index.set_peer_files(peer_id, files, incarnation, version, metadata)
         return True
 
+    @Pyro5.api.expose
+    def register_delta(self, peer_id: int, incarnation: str, base_version: int, version: int, added: List[str],
+                       removed: List[str], uri: str = None, metadata: Dict[str, list] = None) -> Union[bool, Dict]:
+        if not self.is_tracker:
+            return False
+
+        if len(added) + len(removed) > REGISTRATION_SMALL_DELTA:
+            retry_after = self.admission.try_admit(peer_id)
+            if retry_after is not None:
+                return {"retry_after": retry_after}
+
+        self._note_registration(peer_id, uri)
+        if not self.file_index.apply_delta(peer_id, incarnation, base_version, version, added, removed, metadata):
+            self.logger.info(f"Versão {base_version} do peer {peer_id} desconhecida, solicitando lista completa")
+            return False
+
+        if added or removed:
+            self.logger.info(f"Peer {peer_id} na versão {version}: +{len(added)} -{len(removed)} arquivos")
+        return True
+
+    def _note_registration(self, peer_id: int, uri: str):
+        if uri:
+            self._add_member(peer_id, uri)
+        elif peer_id not in self.members:
+            self._refresh_members()
+
     @Pyro5.api.expose
     def register_file_add(self, peer_id: int, file: str) -> bool:
         if not self.is_tracker:
@@ -329,10 +1115,7 @@ class Peer:
 
         self.logger.info(f"Registrando o arquivo {file} para peer {peer_id}")
 
-        if peer_id not in self.file_index:
-            self.file_index[peer_id] = set()
-
-        self.file_index[peer_id].add(file)
+        self.file_index.add(peer_id, file)
 
         return True
 
@@ -343,10 +1126,7 @@ class Peer:
 
         self.logger.info(f"Removendo o arquivo {file} para peer {peer_id}")
 
-        if peer_id not in self.file_index:
-            self.file_index[peer_id] = set()
-
-        self.file_index[peer_id].discard(file)
+        self.file_index.remove(peer_id, file)
 
         return True
 
@@ -357,113 +1137,595 @@ class Peer:
 
         self.logger.info(f"Buscando arquivo {filename}")
 
-        if not hasattr(self, 'file_index'):
-            self.file_index = {}
-
-        peers_with_file = []
-        for peer_id, files in self.file_index.items():
-            if filename in files:
-                peers_with_file.append(peer_id)
+        peers_with_file = self.file_index.holders_of(filename)
 
         self.logger.info(f"Peers com arquivo {filename}: {peers_with_file}")
         return peers_with_file
 
-    def search_file_from_tracker(self, filename: str) -> List[int]:
+    @Pyro5.api.expose
+    def query_files(self, pattern: str, mode: str = "exact", offset: int = 0, limit: int = 100) -> Dict:
+        if not self.is_tracker:
+            return {}
+
+        result = self.file_index.query(pattern, mode, offset, limit)
+        self.logger.info(f"Busca '{pattern}' ({mode}): {result['total']} arquivos")
+        return result
+
+    def query_files_from_tracker(self, pattern: str, mode: str = "exact", offset: int = 0, limit: int = 100) -> Dict:
       try:
-          name_server = Pyro5.api.locate_ns()
-          trackers = [name for name in name_server.list().keys() if name.startswith("Tracker_Epoca_")]
+          if self.is_tracker:
+              return self.query_files(pattern, mode, offset, limit)
+          return self.resolver.call("query_files", pattern, mode, offset, limit)
+      except Exception as e:
+          self.logger.error(f"Erro ao consultar arquivos no tracker: {e}")
+          return {}
 
-          if not trackers:
-              self.logger.error("Nenhum tracker registrado")
-              return []
+    @Pyro5.api.expose
+    def search_hash(self, digest: str) -> List[List]:
+        if not self.is_tracker:
+            return []
+
+        return self.file_index.holders_of_hash(digest)
+
+    @Pyro5.api.expose
+    def locate_file(self, filename: str) -> Dict:
+        if not self.is_tracker:
+            return {}
 
-          max_epoch = max([int(t.split("_")[-1]) for t in trackers])
-          tracker_name = f"Tracker_Epoca_{max_epoch}"
-          tracker_uri = name_server.lookup(tracker_name)
+        return self.file_index.locate(filename)
 
-          tracker_proxy = Pyro5.api.Proxy(tracker_uri)
+    def locate_file_from_tracker(self, filename: str) -> Dict:
+      try:
+          if self.is_tracker:
+              return self.locate_file(filename)
+          return self.resolver.call("locate_file", filename)
+      except Exception as e:
+          self.logger.error(f"Erro ao localizar arquivo no tracker: {e}")
+          return {}
 
-          peers = tracker_proxy.search_file(filename)
+    def search_file_from_tracker(self, filename: str) -> List[int]:
+      try:
+          peers = self.resolver.call("search_file", filename)
           self.logger.info(f"Peers com arquivo {filename}: {peers}")
           return peers
       except Exception as e:
           self.logger.error(f"Erro ao buscar arquivo no tracker: {e}")
           return []
 
+    def _local_file_path(self, filename: str) -> str:
+        if not filename or filename in (".", "..") or os.path.basename(filename) != filename or is_partial(filename):
+            raise ValueError(f"Nome de arquivo inválido: {filename!r}")
+        return os.path.join(self.files_path, filename)
+
+    @Pyro5.api.expose
+    def open_transfer(self, filename: str) -> Dict:
+        self._close_idle_transfers()
+
+        try:
+            f = open(self._local_file_path(filename), "rb")
+        except Exception as e:
+            self.logger.error(f"Erro ao abrir transferência de {filename}: {e}")
+            return {}
+
+        stat = os.fstat(f.fileno())
+        size = stat.st_size
+        with self.file_meta_lock:
+            cached = self.file_meta.get(filename)
+        digest = cached[2] if cached and cached[0] == size and cached[1] == stat.st_mtime_ns else None
+
+        transfer_id = uuid.uuid4().hex
+        with self.transfers_lock:
+            self.transfers[transfer_id] = {
+                "file": f,
+                "filename": filename,
+                "lock": threading.Lock(),
+                "last_access": time.time(),
+            }
+
+        self.logger.info(f"Transferência {transfer_id} aberta para {filename} ({size} bytes)")
+        return {"transfer_id": transfer_id, "size": size, "hash": digest}
+
+    @Pyro5.api.expose
+    def read_chunk(self, transfer_id: str, offset: int, length: int) -> bytes:
+        with self.transfers_lock:
+            transfer = self.transfers.get(transfer_id)
+
+        if transfer is None:
+            raise ValueError(f"Transferência desconhecida: {transfer_id}")
+
+        length = max(0, min(length, TRANSFER_MAX_CHUNK_SIZE))
+        with transfer["lock"]:
+            transfer["last_access"] = time.time()
+            f = transfer["file"]
+            f.seek(offset)
+            return _wire_bytes(f.read(length))
+
     @Pyro5.api.expose
-    def download_file(self, filename: str) -> bytes:
-        file_path = os.path.join(self.files_path, filename)
+    def open_data_channel(self, transfer_id: str, accept: List[str] = None, link_rate: float = None) -> Dict:
+        if self.data_channel is None:
+            return {}
+
+        with self.transfers_lock:
+            transfer = self.transfers.get(transfer_id)
+            if transfer is None:
+                return {}
+
+        codec = self._choose_codec(transfer, accept or [], link_rate)
+
+        with self.transfers_lock:
+            token = new_token()
+            transfer["token"] = token
+            transfer["codec"] = codec
+            self.data_tokens[token] = transfer_id
+
+        return {"host": self.data_channel.host, "port": self.data_channel.port, "token": token, "codec": codec}
+
+    def _choose_codec(self, transfer: Dict, accept: List[str], link_rate: float) -> str:
+        filename = transfer["filename"]
+        codecs = [codec for codec in accept if codec in compression.CODECS]
+        if not codecs or compression.already_compressed(filename):
+            return None
 
         try:
-            with open(file_path, "rb") as f:
-                content = f.read()
+            stat = os.fstat(transfer["file"].fileno())
+            key = (filename, stat.st_size, stat.st_mtime_ns)
+            measurements = self.compression_profiles.get(key)
+            if measurements is None:
+                measurements = compression.profile(self._local_file_path(filename), stat.st_size, list(compression.CODECS))
+                self.compression_profiles[key] = measurements
+        except Exception as e:
+            self.logger.warning(f"Erro ao amostrar compressão de {filename}: {e}")
+            return None
+
+        codec = compression.choose({c: m for c, m in measurements.items() if c in codecs}, link_rate)
+        if codec:
+            self.logger.info(f"Compressão {codec} para {filename} (razão estimada {measurements[codec]['ratio']:.2f})")
+        return codec
+
+    def _data_channel_transfer(self, token: str) -> Dict:
+        with self.transfers_lock:
+            return self.transfers.get(self.data_tokens.get(token))
+
+    @Pyro5.api.expose
+    def close_transfer(self, transfer_id: str) -> bool:
+        with self.transfers_lock:
+            transfer = self.transfers.pop(transfer_id, None)
+            if transfer is not None:
+                self.data_tokens.pop(transfer.get("token"), None)
 
-            self.logger.info(f"Enviando arquivo {filename} ({len(content)} bytes)")
-            return content
+        if transfer is None:
+            return False
+
+        with transfer["lock"]:
+            transfer["file"].close()
+
+        self.logger.info(f"Transferência {transfer_id} de {transfer['filename']} encerrada")
+        return True
+
+    def _close_idle_transfers(self):
+        now = time.time()
+        with self.transfers_lock:
+            idle = [tid for tid, t in self.transfers.items() if now - t["last_access"] > TRANSFER_IDLE_TIMEOUT]
+
+        for transfer_id in idle:
+            self.logger.warning(f"Encerrando transferência ociosa {transfer_id}")
+            self.close_transfer(transfer_id)
+
+    def _merkle_tree_path(self, digest: str) -> str:
+        return os.path.join(self.meta_path, MERKLE_DIR, f"{digest}.json")
+
+    def _load_merkle_tree(self, digest: str) -> Dict:
+        try:
+            with open(self._merkle_tree_path(digest)) as f:
+                tree = json.load(f)
+        except (FileNotFoundError, ValueError):
+            return None
+        return tree if tree.get("chunk_size") == TRANSFER_CHUNK_SIZE else None
+
+    def _schedule_merkle_tree(self, filename: str):
+        with self.merkle_lock:
+            if filename in self.merkle_building:
+                return
+            self.merkle_building.add(filename)
+        self.merkle_executor.submit(self._build_merkle_tree, filename)
+
+    def _build_merkle_tree(self, filename: str):
+        try:
+            digest, tree = merkle.hash_and_build_tree(self._local_file_path(filename), TRANSFER_CHUNK_SIZE)
+            self._save_merkle_tree(digest, tree)
         except Exception as e:
-            self.logger.error(f"Erro ao enviar arquivo {filename}: {e}")
-            return b""
+            self.logger.warning(f"Erro ao gerar árvore de Merkle de {filename}: {e}")
+        finally:
+            with self.merkle_lock:
+                self.merkle_building.discard(filename)
+
+    def _save_merkle_tree(self, digest: str, tree: Dict):
+        tree_path = self._merkle_tree_path(digest)
+        try:
+            os.makedirs(os.path.dirname(tree_path), exist_ok=True)
+            with open(tree_path + ".tmp", "w") as f:
+                json.dump(tree, f)
+            os.replace(tree_path + ".tmp", tree_path)
+        except Exception as e:
+            self.logger.warning(f"Erro ao salvar árvore de Merkle {digest}: {e}")
+
+    @Pyro5.api.expose
+    def get_merkle_tree(self, filename: str) -> Dict:
+        digest = self._file_digest(filename)
+        if digest is None:
+            return {}
+
+        # Arquivos grandes levam mais que o COMMTIMEOUT para percorrer: a RPC só entrega árvores prontas
+        tree = self._load_merkle_tree(digest)
+        if tree is None:
+            self._schedule_merkle_tree(filename)
+            return {"pending": True}
+        return tree
+
+    def _fetch_merkle_tree(self, peer_proxy, filename: str, size: int) -> Dict:
+        try:
+            tree = peer_proxy.get_merkle_tree(filename)
+        except Pyro5.errors.CommunicationError:
+            raise
+        except Exception as e:
+            self.logger.warning(f"Peer não forneceu árvore de Merkle de {filename}: {e}")
+            return None
+
+        if tree and tree.get("pending"):
+            self.logger.info(f"Árvore de Merkle de {filename} ainda em construção no peer, só o hash final será verificado")
+            return None
+
+        if tree and merkle.valid_tree(tree) and tree["size"] == size and tree["chunk_size"] <= TRANSFER_MAX_CHUNK_SIZE:
+            return tree
+
+        self.logger.warning(f"Árvore de Merkle inválida para {filename}, pedaços não serão verificados")
+        return None
+
+    def _chunk_ok(self, data: bytes, offset: int, tree: Dict) -> bool:
+        return tree is None or merkle.chunk_hash(data) == tree["leaves"][offset // tree["chunk_size"]]
+
+    def _chunk_reader(self, peer_proxy, transfer_id: str, chunk_size: int):
+        link = str(peer_proxy._pyroUri.location)
+        with self.link_lock:
+            link_rate = self.link_rates.get(link)
+
+        try:
+            channel = peer_proxy.open_data_channel(transfer_id, list(compression.CODECS), link_rate)
+            if channel:
+                client = DataChannelClient(channel["host"], channel["port"], channel["token"], chunk_size, channel.get("codec"))
+                return client.read, lambda: self._close_data_channel(client, link)
+        except Pyro5.errors.CommunicationError:
+            raise
+        except Exception as e:
+            self.logger.warning(f"Canal de dados indisponível, usando RPC para a transferência {transfer_id}: {e}")
+
+        return lambda offset, length: _to_bytes(peer_proxy.read_chunk(transfer_id, offset, length)), lambda: None
+
+    def _close_data_channel(self, client: DataChannelClient, link: str):
+        client.close()
+
+        with self.link_lock:
+            self.received_stats["bytes_received"] += client.bytes_received
+            self.received_stats["bytes_raw"] += client.bytes_raw
+            # Vazão do link medida em bytes no fio, para a próxima negociação de compressão
+            if client.bytes_received >= LINK_RATE_MIN_SAMPLE and client.wire_time > 0:
+                rate = client.bytes_received / client.wire_time
+                previous = self.link_rates.get(link)
+                self.link_rates[link] = rate if previous is None else previous + LINK_RATE_SMOOTHING * (rate - previous)
+
+        if client.codec and client.bytes_received:
+            self.logger.info(f"Transferência com {client.codec}: {client.bytes_raw} bytes em {client.bytes_received} no fio")
+
+    def _read_verified_chunk(self, read, offset: int, length: int, tree: Dict) -> bytes:
+        for attempt in range(MERKLE_MAX_RETRIES):
+            data = read(offset, length)
+            if len(data) != length:
+                raise IOError(f"Pedaço incompleto em {offset}: {len(data)} de {length} bytes")
+            if self._chunk_ok(data, offset, tree):
+                return data
+            self.logger.warning(f"Pedaço em {offset} corrompido, buscando novamente ({attempt + 1}/{MERKLE_MAX_RETRIES})")
+
+        raise IOError(f"Pedaço em {offset} continua corrompido após {MERKLE_MAX_RETRIES} tentativas")
+
+    def _open_partial(self, filename: str, size: int, tree: Dict, digest: str) -> PartialDownload:
+        chunk_size = tree["chunk_size"] if tree else TRANSFER_CHUNK_SIZE
+        partial = PartialDownload.open(self._local_file_path(filename), size, chunk_size, digest)
+
+        completed = partial.completed()
+        if completed:
+            self.logger.info(f"Retomando download de {filename}: {completed} de {partial.total_chunks} pedaços já baixados")
+        return partial
+
+    def _stream_transfer(self, peer_proxy, transfer: Dict, partial: PartialDownload, tree: Dict = None) -> int:
+        transfer_id = transfer["transfer_id"]
+        received = 0
+
+        try:
+            read, close_reader = self._chunk_reader(peer_proxy, transfer_id, partial.chunk_size)
+            try:
+                for offset in partial.missing():
+                    length = min(partial.chunk_size, partial.size - offset)
+                    data = self._read_verified_chunk(read, offset, length, tree)
+                    partial.write(offset, data)
+                    received += len(data)
+            finally:
+                close_reader()
+        finally:
+            try:
+                peer_proxy.close_transfer(transfer_id)
+            except Exception as e:
+                self.logger.warning(f"Erro ao encerrar transferência {transfer_id}: {e}")
+
+        return received
 
     def download_file_from_peer(self, peer_id: int, filename: str) -> bool:
         try:
+            file_path = self._local_file_path(filename)
+
             name_server = Pyro5.api.locate_ns()
             peer_uri = name_server.lookup(f"peer.{peer_id}")
-            peer_proxy = Pyro5.api.Proxy(peer_uri)
 
+            peer_proxy = self.pool.get(peer_uri)
             self.logger.info(f"Fazendo download de {filename} do peer {peer_id}")
-            content = peer_proxy.download_file(filename)
+            try:
+                transfer = peer_proxy.open_transfer(filename)
 
-            if not content:
-                self.logger.error(f"Arquivo {filename} vazio ou não encontrado no peer {peer_id}")
-                return False
+                if not transfer:
+                    self.logger.error(f"Arquivo {filename} não encontrado no peer {peer_id}")
+                    return False
 
-            content = base64.b64decode(content['data'])
+                tree = self._fetch_merkle_tree(peer_proxy, filename, transfer["size"])
+                partial = self._open_partial(filename, transfer["size"], tree, transfer.get("hash"))
+                try:
+                    received = self._stream_transfer(peer_proxy, transfer, partial, tree)
+                finally:
+                    partial.close()
+            except Pyro5.errors.CommunicationError:
+                self.pool.discard(peer_uri)
+                raise
+
+            partial.finish()
+            self._verify_download(filename, file_path, transfer.get("hash"), tree)
+            self.logger.info(f"Arquivo {filename} baixado com sucesso ({received} bytes)")
+
+            self._register_download(filename)
+            return True
+        except Exception as e:
+            self.logger.error(f"Erro ao baixar arquivo {filename} do peer {peer_id}: {e}")
+            return False
 
-            file_path = os.path.join(self.files_path, filename)
-            with open(file_path, "wb") as f:
-                f.write(content)
+    def _verify_download(self, filename: str, file_path: str, expected_hash: str, tree: Dict = None):
+        digest = _hash_file(file_path)
+        if expected_hash and digest != expected_hash:
+            os.remove(file_path)
+            raise IOError(f"Conteúdo de {filename} não confere: esperado {expected_hash}, recebido {digest}")
 
-            self.logger.info(f"Arquivo {filename} baixado com sucesso ({len(content)} bytes)")
+        self._update_file_meta(filename, digest=digest)
+        self._save_hash_cache()
+        if tree and tree["chunk_size"] == TRANSFER_CHUNK_SIZE:
+            self._save_merkle_tree(digest, tree)
 
-            self.files.add(filename)
+    def _register_download(self, filename: str):
+        self.files.add(filename)
+        self._publish_local_changes([filename], [])
 
-            success = False
-            for _ in range(3):
-                if self._register_files_with_tracker():
-                    success = True
-                    break
-                time.sleep(0.5)
+    def _probe_transfer(self, sources: Dict[int, tuple], expected_hash: str = None) -> Dict:
+        for peer_id, (uri, remote_name) in sources.items():
+            try:
+                peer_proxy = self.pool.get(uri)
+                transfer = peer_proxy.open_transfer(remote_name)
+                if transfer:
+                    peer_proxy.close_transfer(transfer["transfer_id"])
+                    if not expected_hash or transfer.get("hash") in (None, expected_hash):
+                        transfer["tree"] = self._fetch_merkle_tree(peer_proxy, remote_name, transfer["size"])
+                        return transfer
+            except Exception as e:
+                self.pool.discard(uri)
+                self.logger.warning(f"Peer {peer_id} não respondeu à consulta de {remote_name}: {e}")
+        return {}
+
+    def download_file_swarm(self, filename: str, peer_ids: List[int] = None, cancel: threading.Event = None) -> bool:
+        try:
+            file_path = self._local_file_path(filename)
+
+            expected_hash = None
+            if peer_ids is None:
+                located = self.locate_file_from_tracker(filename)
+                expected_hash = located.get("hash")
+                holders = located.get("sources", [])
+            else:
+                holders = [[peer_id, filename] for peer_id in peer_ids]
 
-            if not success:
-                self.logger.warning(f"Não foi possível registrar {filename} com o tracker após várias tentativas")
+            remote_names = {}
+            for peer_id, remote_name in holders:
+                if peer_id != self.peer_id:
+                    remote_names.setdefault(peer_id, remote_name)
 
+            if not remote_names:
+                self.logger.error(f"Nenhum peer possui o arquivo {filename}")
+                return False
+
+            name_server = Pyro5.api.locate_ns()
+            sources = {}
+            for peer_id in list(remote_names)[:SWARM_MAX_SOURCES]:
+                try:
+                    sources[peer_id] = (name_server.lookup(f"peer.{peer_id}"), remote_names[peer_id])
+                except Exception as e:
+                    self.logger.warning(f"Peer {peer_id} não encontrado no serviço de nomes: {e}")
+
+            probe = self._probe_transfer(sources, expected_hash)
+            if not probe:
+                self.logger.error(f"Nenhum peer conseguiu servir o arquivo {filename}")
+                return False
+
+            size = probe["size"]
+            expected_hash = expected_hash or probe.get("hash")
+            tree = probe["tree"]
+            chunk_size = tree["chunk_size"] if tree else TRANSFER_CHUNK_SIZE
+
+            self.logger.info(f"Download em enxame de {filename} ({size} bytes) a partir dos peers {list(sources)}")
+
+            partial = self._open_partial(filename, size, tree, expected_hash)
+
+            total_chunks = partial.total_chunks
+            pending = collections.deque(partial.missing())
+            in_flight: Dict[int, int] = {}
+            done: Set[int] = set(partial.present())
+            banned: Dict[int, Set[int]] = {}
+            received = {peer_id: 0 for peer_id in sources}
+            corrupt = {peer_id: 0 for peer_id in sources}
+            lock = threading.Lock()
+
+            def next_offset(peer_id):
+                with lock:
+                    if len(done) == total_chunks:
+                        return None, True
+
+                    allowed = [o for o in pending if peer_id not in banned.get(o, ())]
+                    if allowed:
+                        offset = allowed[0]
+                        pending.remove(offset)
+                    else:
+                        # Fim do download: duplica um pedaço ainda em andamento em outro peer, possivelmente lento
+                        candidates = [o for o, n in in_flight.items() if n == 1 and o not in done and peer_id not in banned.get(o, ())]
+                        if not candidates:
+                            # Só restam pedaços que este peer já entregou corrompidos
+                            return None, not in_flight
+                        offset = candidates[0]
+                    in_flight[offset] = in_flight.get(offset, 0) + 1
+                    return offset, False
+
+            def release(offset, completed):
+                with lock:
+                    in_flight[offset] -= 1
+                    if in_flight[offset] == 0:
+                        del in_flight[offset]
+                    if completed:
+                        done.add(offset)
+                    elif offset not in done and offset not in in_flight:
+                        pending.appendleft(offset)
+
+            def worker(peer_id, uri, remote_name):
+                offset = None
+                try:
+                    peer_proxy = self.pool.get(uri)
+                    transfer = peer_proxy.open_transfer(remote_name)
+                    if not transfer or transfer["size"] != size or transfer.get("hash") not in (None, expected_hash):
+                        self.logger.warning(f"Peer {peer_id} não possui o mesmo conteúdo de {filename}")
+                        if transfer:
+                            peer_proxy.close_transfer(transfer["transfer_id"])
+                        return
+
+                    read, close_reader = self._chunk_reader(peer_proxy, transfer["transfer_id"], chunk_size)
+                    try:
+                        while True:
+                            # Cancelamento só entre pedaços: o parcial fica consistente para retomar depois
+                            if cancel is not None and cancel.is_set():
+                                return
+                            offset, finished = next_offset(peer_id)
+                            if finished:
+                                return
+                            if offset is None:
+                                time.sleep(0.05)
+                                continue
+
+                            length = min(chunk_size, size - offset)
+                            data = read(offset, length)
+                            if len(data) != length:
+                                raise IOError(f"Pedaço incompleto em {offset}: {len(data)} de {length} bytes")
+
+                            if not self._chunk_ok(data, offset, tree):
+                                self.logger.warning(f"Pedaço em {offset} do peer {peer_id} corrompido, buscando em outro peer")
+                                with lock:
+                                    banned.setdefault(offset, set()).add(peer_id)
+                                    corrupt[peer_id] += 1
+                                release(offset, False)
+                                offset = None
+                                if corrupt[peer_id] >= SWARM_MAX_CORRUPT_CHUNKS:
+                                    raise IOError(f"{corrupt[peer_id]} pedaços corrompidos")
+                                continue
+
+                            with lock:
+                                duplicate = offset in done
+                            if not duplicate:
+                                partial.write(offset, data)
+                                received[peer_id] += length
+
+                            release(offset, True)
+                            offset = None
+                    finally:
+                        close_reader()
+                        try:
+                            peer_proxy.close_transfer(transfer["transfer_id"])
+                        except Exception:
+                            pass
+                except Exception as e:
+                    self.logger.warning(f"Peer {peer_id} removido do enxame de {filename}: {e}")
+                    self.pool.discard(uri)
+                    if offset is not None:
+                        release(offset, False)
+
+            workers = [
+                threading.Thread(target=worker, args=(peer_id, uri, remote_name), daemon=True)
+                for peer_id, (uri, remote_name) in sources.items()
+            ]
+            for thread in workers:
+                thread.start()
+            for thread in workers:
+                thread.join()
+            partial.close()
+
+            if len(done) != total_chunks and cancel is not None and cancel.is_set():
+                self.logger.warning(f"Download em enxame de {filename} cancelado com {len(done)} de {total_chunks} pedaços")
+                return False
+            if len(done) != total_chunks:
+                self.logger.error(f"Download em enxame de {filename} incompleto: {len(done)} de {total_chunks} pedaços")
+                return False
+
+            partial.finish()
+            self._verify_download(filename, file_path, expected_hash, tree)
+            self.logger.info(f"Arquivo {filename} baixado em enxame com sucesso. Bytes por peer: {received}")
+
+            self._register_download(filename)
             return True
         except Exception as e:
-            self.logger.error(f"Erro ao baixar arquivo {filename} do peer {peer_id}: {e}")
+            self.logger.error(f"Erro no download em enxame de {filename}: {e}")
             return False
 
     @Pyro5.api.expose
     def ping(self) -> bool:
         return True
 
+    @Pyro5.api.expose
+    def get_stats(self) -> Dict:
+        with self.heartbeat_lock:
+            heartbeat = {str(peer_id): dict(health) for peer_id, health in self.heartbeat_health.items()}
+        with self.link_lock:
+            received = dict(self.received_stats)
+            link_rates = dict(self.link_rates)
+
+        return {
+            "proxy_pool": self.pool.stats(),
+            "tracker_lookups": self.resolver.lookups,
+            "heartbeat": heartbeat,
+            "data_channel_bytes_sent": self.data_channel.bytes_sent if self.data_channel else 0,
+            "registration_admission": self.admission.stats(),
+            "compression": {
+                "sent": self.data_channel.stats() if self.data_channel else {},
+                "received": received,
+                "link_rates": link_rates,
+            },
+        }
+
     def start(self):
       try:
-          daemon = Pyro5.api.Daemon(host='localhost')
-          self._pyroDaemon = daemon
-
-          uri = daemon.register(self)
+          daemon = self._start_services()
 
-          self.logger.info(f"Daemon iniciado com URI: {uri}")
+          if self.host is None:
+              daemon_thread = threading.Thread(target=daemon.requestLoop, daemon=True)
+              daemon_thread.start()
 
-          name_server = Pyro5.api.locate_ns()
-          peer_name = f"peer.{self.peer_id}"
-          name_server.register(peer_name, uri)
-          self.logger.info(f"Registrado no serviço de nomes como {peer_name}")
-
-          daemon_thread = threading.Thread(target=daemon.requestLoop, daemon=True)
-          daemon_thread.start()
-
-          time.sleep(1)
+              time.sleep(1)
 
           self.find_and_register_with_tracker()
 
@@ -473,6 +1735,78 @@ class Peer:
           self.logger.error(f"Erro ao iniciar peer: {e}")
           return False
 
+    def _start_services(self) -> Pyro5.api.Daemon:
+        daemon = self.host.daemon if self.host else Pyro5.api.Daemon(host='localhost')
+        self._pyroDaemon = daemon
+
+        uri = daemon.register(self)
+        self.uri = uri
+
+        self.logger.info(f"Daemon iniciado com URI: {uri}")
+
+        if self.host:
+            self.data_channel = self.host.data_channel
+        else:
+            self.data_channel = DataChannelServer(self.logger, self._data_channel_transfer, TRANSFER_MAX_CHUNK_SIZE)
+            self.data_channel.start()
+            self.logger.info(f"Canal de dados em {self.data_channel.host}:{self.data_channel.port}")
+
+        if self.host is None or self.host.watch:
+            self.watcher = FileWatcher(self.files_path, self.logger, self._on_local_changes,
+                                       self._rescan_local_files, is_partial)
+            self.watcher.start()
+
+        if self.scheduler is None:
+            self.scheduler = default_scheduler()
+        self.maintenance_task = self.scheduler.call_every(MAINTENANCE_INTERVAL, self._maintenance)
+
+        name_server = Pyro5.api.locate_ns()
+        peer_name = f"peer.{self.peer_id}"
+        name_server.register(peer_name, uri)
+        self.logger.info(f"Registrado no serviço de nomes como {peer_name}")
+
+        return daemon
+
+    def stop(self):
+        self.stopped = True
+        for task in (self.heartbeat_timer, self.heartbeat_task, self.reregister_timer, self.maintenance_task):
+            if task:
+                self.scheduler.cancel(task)
+
+        if not self.is_tracker:
+            try:
+                self.resolver.call("leave", self.peer_id)
+            except Exception as e:
+                self.logger.warning(f"Erro ao notificar saída ao tracker: {e}")
+        self.is_tracker = False
+
+        try:
+            name_server = Pyro5.api.locate_ns()
+            name_server.remove(f"peer.{self.peer_id}")
+        except Exception as e:
+            self.logger.warning(f"Erro ao remover registro do serviço de nomes: {e}")
+
+        if self.watcher:
+            self.watcher.stop()
+
+        daemon = getattr(self, "_pyroDaemon", None)
+        if self.host:
+            # Recursos do host continuam servindo os outros peers
+            if daemon:
+                daemon.unregister(self)
+            self.logger.info(f"Peer {self.peer_id} encerrado")
+            return
+
+        if daemon:
+            daemon.shutdown()
+        if self.data_channel:
+            self.data_channel.stop()
+
+        self.election_executor.shutdown(wait=False, cancel_futures=True)
+        self.heartbeat_executor.shutdown(wait=False, cancel_futures=True)
+        self.merkle_executor.shutdown(wait=False, cancel_futures=True)
+        self.logger.info(f"Peer {self.peer_id} encerrado")
+
     def add_file(self, filename: str, content: bytes) -> bool:
         try:
             file_path = os.path.join(self.files_path, filename)
@@ -481,27 +1815,11 @@ class Peer:
 
             self.logger.info(f"Arquivo {filename} adicionado localmente")
 
+            self._update_file_meta(filename)
+            self._save_hash_cache()
             self.files.add(filename)
 
-            if not self.is_tracker:
-                name_server = Pyro5.api.locate_ns()
-                trackers = [name for name in name_server.list().keys() if name.startswith("Tracker_Epoca_")]
-
-                if not trackers:
-                    self.logger.error("Nenhum tracker registrado")
-                    return False
-
-                max_epoch = max([int(t.split("_")[-1]) for t in trackers])
-                tracker_name = f"Tracker_Epoca_{max_epoch}"
-                tracker_uri = name_server.lookup(tracker_name)
-
-                tracker_proxy = Pyro5.api.Proxy(tracker_uri)
-                tracker_proxy.register_file_add(self.peer_id, filename)
-            else:
-                if not hasattr(self, 'file_index'):
-                    self.file_index = {}
-                self.file_index[self.peer_id] = self.files
-
+            self._publish_local_changes([filename], [])
             return True
         except Exception as e:
             self.logger.error(f"Erro ao adicionar arquivo {filename}: {e}")
@@ -516,26 +1834,12 @@ class Peer:
 
                 self.logger.info(f"Arquivo {filename} removido localmente")
 
+                with self.file_meta_lock:
+                    self.file_meta.pop(filename, None)
+                self._save_hash_cache()
                 self.files.discard(filename)
 
-                if not self.is_tracker:
-                    name_server = Pyro5.api.locate_ns()
-                    trackers = [name for name in name_server.list().keys() if name.startswith("Tracker_Epoca_")]
-
-                    if not trackers:
-                        self.logger.error("Nenhum tracker registrado")
-                        return False
-
-                    max_epoch = max([int(t.split("_")[-1]) for t in trackers])
-                    tracker_name = f"Tracker_Epoca_{max_epoch}"
-                    tracker_uri = name_server.lookup(tracker_name)
-
-                    tracker_proxy = Pyro5.api.Proxy(tracker_uri)
-                    tracker_proxy.register_file_removal(self.peer_id, filename)
-                else:
-                    if not hasattr(self, 'file_index'):
-                        self.file_index = {}
-                    self.file_index[self.peer_id] = self.files
+                self._publish_local_changes([], [filename])
                 return True
             return False
         
@@ -545,43 +1849,55 @@ class Peer:
 
 
     def get_local_files(self) -> Set[str]:
-        self._scan_local_files()
-        return self.files
+        if self.watcher is None:
+            self._scan_local_files()
+        # Cópia: o watcher altera self.files em outra thread
+        return set(self.files)
     
 
     def get_all_network_files(self) -> Dict[int, List[str]]:
       if self.is_tracker:
-
-          if not hasattr(self, 'file_index'):
-              self.file_index = {}
-          return {peer_id: list(files) for peer_id, files in self.file_index.items()}
+          return self.file_index.snapshot()
 
       try:
-          name_server = Pyro5.api.locate_ns()
-          trackers = [name for name in name_server.list().keys() if name.startswith("Tracker_Epoca_")]
-
-          if not trackers:
-              self.logger.error("Nenhum tracker registrado")
-              return {}
-
-          max_epoch = max([int(t.split("_")[-1]) for t in trackers])
-          tracker_name = f"Tracker_Epoca_{max_epoch}"
-          tracker_uri = name_server.lookup(tracker_name)
-
-          tracker_proxy = Pyro5.api.Proxy(tracker_uri)
-
-          return tracker_proxy.get_file_index()
+          self._sync_network_index()
+          return self.network_index.snapshot()
       
       except Exception as e:
           self.logger.error(f"Erro ao obter índice de arquivos: {e}")
           return {}
 
+    def get_network_stats(self) -> Dict:
+      if self.is_tracker:
+          return self.file_index.stats()
+
+      try:
+          return self.resolver.call("get_index_stats")
+      except Exception as e:
+          self.logger.error(f"Erro ao obter estatísticas do índice: {e}")
+          return {}
+
+    @Pyro5.api.expose
+    def get_file_index(self) -> Dict[str, List[str]]:
+        if not self.is_tracker:
+            return {}
+
+        return _wire_keys(self.file_index.snapshot())
+
     @Pyro5.api.expose
-    def get_file_index(self) -> Dict[int, List[str]]:
+    def get_file_index_since(self, version: int, index_id: str = None) -> Dict:
         if not self.is_tracker:
             return {}
 
-        if not hasattr(self, 'file_index'):
-            self.file_index = {}
+        changes = self.file_index.changes_since(version, index_id)
+        if changes and changes["full"]:
+            changes["index"] = _wire_keys(changes["index"])
+            changes["versions"] = _wire_keys(changes["versions"])
+        return changes
+
+    @Pyro5.api.expose
+    def get_index_stats(self) -> Dict:
+        if not self.is_tracker:
+            return {}
 
-        return {peer_id: list(files) for peer_id, files in self.file_index.items()}
+        return self.file_index.stats()
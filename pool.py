@@ -0,0 +1,166 @@
+import time
+import socket
+import threading
+import contextlib
+import Pyro5.api
+from typing import Dict, List, Tuple
+
+DEFAULT_IDLE_TIMEOUT = 30.0
+DEFAULT_HEALTH_CHECK_INTERVAL = 5.0
+
+
+def _connection_alive(proxy) -> bool:
+    connection = proxy._pyroConnection
+    if connection is None:
+        return True
+
+    sock = connection.sock
+    previous_timeout = sock.gettimeout()
+    try:
+        sock.setblocking(False)
+        # Um proxy ocioso não deve ter nada para ler; b"" indica conexão fechada pelo outro lado
+        return not sock.recv(1, socket.MSG_PEEK)
+    except BlockingIOError:
+        return True
+    except OSError:
+        return False
+    finally:
+        try:
+            sock.settimeout(previous_timeout)
+        except OSError:
+            pass
+
+
+def _release(proxy):
+    try:
+        proxy._pyroClaimOwnership()
+        proxy._pyroRelease()
+    except Exception:
+        pass
+
+
+class ProxyPool:
+    def __init__(self, idle_timeout: float = DEFAULT_IDLE_TIMEOUT, health_check_interval: float = DEFAULT_HEALTH_CHECK_INTERVAL):
+        self.idle_timeout = idle_timeout
+        self.health_check_interval = health_check_interval
+        self.lock = threading.Lock()
+        self.entries: Dict[Tuple[int, str], dict] = {}
+        self.idle: Dict[str, List[dict]] = {}
+        self.last_sweep = time.time()
+        self.counters = {
+            "created": 0,
+            "reused": 0,
+            "evicted": 0,
+            "discarded": 0,
+            "health_checks": 0,
+            "health_failures": 0,
+        }
+
+    def get(self, uri, timeout: float = None):
+        key = (threading.get_ident(), str(uri))
+        now = time.time()
+
+        if now - self.last_sweep > self.idle_timeout / 2:
+            self.evict_idle()
+
+        with self.lock:
+            entry = self.entries.get(key)
+
+        if entry is not None and now - entry["last_used"] > self.idle_timeout:
+            self._close(key, "evicted")
+            entry = None
+
+        if entry is not None and now - entry["last_checked"] > self.health_check_interval:
+            entry["last_checked"] = now
+            healthy = _connection_alive(entry["proxy"])
+            with self.lock:
+                self.counters["health_checks"] += 1
+                if not healthy:
+                    self.counters["health_failures"] += 1
+            if not healthy:
+                self._close(key, "evicted")
+                entry = None
+
+        if entry is None:
+            entry = {"proxy": Pyro5.api.Proxy(uri), "last_checked": now}
+            with self.lock:
+                self.entries[key] = entry
+                self.counters["created"] += 1
+        else:
+            with self.lock:
+                self.counters["reused"] += 1
+
+        entry["last_used"] = now
+        proxy = entry["proxy"]
+        proxy._pyroTimeout = timeout if timeout is not None else Pyro5.config.COMMTIMEOUT
+        return proxy
+
+    @contextlib.contextmanager
+    def lease(self, uri, timeout: float = None):
+        # Empréstimo exclusivo: qualquer thread reaproveita a conexão livre do destino, então
+        # um pool de threads grande falando com muitos peers mantém uma conexão por destino, não por thread
+        key = str(uri)
+        with self.lock:
+            idle = self.idle.get(key)
+            entry = idle.pop() if idle else None
+            self.counters["reused" if entry else "created"] += 1
+
+        if entry is None:
+            proxy = Pyro5.api.Proxy(uri)
+        else:
+            proxy = entry["proxy"]
+            proxy._pyroClaimOwnership()
+        proxy._pyroTimeout = timeout if timeout is not None else Pyro5.config.COMMTIMEOUT
+
+        try:
+            yield proxy
+        except BaseException:
+            with self.lock:
+                self.counters["discarded"] += 1
+            _release(proxy)
+            raise
+
+        with self.lock:
+            self.idle.setdefault(key, []).append({"proxy": proxy, "last_used": time.time()})
+
+    def discard(self, uri):
+        self._close((threading.get_ident(), str(uri)), "discarded")
+
+    def evict_idle(self):
+        now = time.time()
+        current = threading.get_ident()
+        alive = {thread.ident for thread in threading.enumerate()}
+
+        with self.lock:
+            self.last_sweep = now
+            # Proxies de outras threads vivas não são tocados: só a dona sabe se estão em uso
+            stale = [key for key, entry in self.entries.items()
+                     if key[0] not in alive or (key[0] == current and now - entry["last_used"] > self.idle_timeout)]
+
+            expired = []
+            for key, idle in list(self.idle.items()):
+                expired.extend(entry["proxy"] for entry in idle if now - entry["last_used"] > self.idle_timeout)
+                idle[:] = [entry for entry in idle if now - entry["last_used"] <= self.idle_timeout]
+                if not idle:
+                    del self.idle[key]
+            self.counters["evicted"] += len(expired)
+
+        for key in stale:
+            self._close(key, "evicted")
+        for proxy in expired:
+            _release(proxy)
+
+    def _close(self, key: Tuple[int, str], reason: str):
+        with self.lock:
+            entry = self.entries.pop(key, None)
+            if entry is None:
+                return
+            self.counters[reason] += 1
+
+        _release(entry["proxy"])
+
+    def stats(self) -> Dict[str, int]:
+        with self.lock:
+            stats = dict(self.counters)
+            stats["open"] = len(self.entries) + sum(len(idle) for idle in self.idle.values())
+        return stats
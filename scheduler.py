@@ -0,0 +1,247 @@
+import time
+import heapq
+import asyncio
+import inspect
+import functools
+import logging
+import itertools
+import threading
+import concurrent.futures
+from typing import Callable, List, Optional
+
+DEFAULT_WORKERS = 8
+COMPACT_MIN_CANCELLED = 64
+
+logger = logging.getLogger("Scheduler")
+
+
+class TimerHandle:
+    __slots__ = ("due", "callback", "args", "interval", "cancelled", "queued")
+
+    def __init__(self, due: float, callback: Callable, args: tuple, interval: Optional[float]):
+        self.due = due
+        self.callback = callback
+        self.args = args
+        self.interval = interval
+        self.cancelled = False
+        self.queued = False
+
+    def cancel(self):
+        self.cancelled = True
+
+
+class Scheduler:
+    def __init__(self, workers: int = DEFAULT_WORKERS, name: str = "scheduler"):
+        self.heap: List[tuple] = []
+        self.cond = threading.Condition()
+        self.sequence = itertools.count()
+        self.cancelled = 0
+        # Só a thread do agendador espera; os callbacks rodam num pool fixo para que um callback lento não atrase os outros
+        self.executor = concurrent.futures.ThreadPoolExecutor(max_workers=workers, thread_name_prefix=f"{name}-worker")
+        self.thread = threading.Thread(target=self._run, daemon=True, name=name)
+        self.thread.start()
+
+    def call_later(self, delay: float, callback: Callable, *args) -> TimerHandle:
+        handle = TimerHandle(time.monotonic() + max(0.0, delay), callback, args, None)
+        self._push(handle)
+        return handle
+
+    def call_every(self, interval: float, callback: Callable, *args, first_delay: float = None) -> TimerHandle:
+        delay = interval if first_delay is None else first_delay
+        handle = TimerHandle(time.monotonic() + max(0.0, delay), callback, args, interval)
+        self._push(handle)
+        return handle
+
+    def reschedule(self, handle: Optional[TimerHandle], delay: float, callback: Callable, *args) -> TimerHandle:
+        if handle is not None:
+            self.cancel(handle)
+        return self.call_later(delay, callback, *args)
+
+    def cancel(self, handle: TimerHandle):
+        with self.cond:
+            if handle.cancelled:
+                return
+            handle.cancel()
+            # Só conta o que ainda ocupa o heap: handles já disparados ou em execução saem sozinhos
+            if not handle.queued:
+                return
+            self.cancelled += 1
+            # Remoção preguiçosa; quando metade do heap é lixo, reconstrói de uma vez
+            if self.cancelled >= COMPACT_MIN_CANCELLED and self.cancelled * 2 > len(self.heap):
+                for entry in self.heap:
+                    entry[2].queued = not entry[2].cancelled
+                self.heap = [entry for entry in self.heap if entry[2].queued]
+                heapq.heapify(self.heap)
+                self.cancelled = 0
+
+    def pending(self) -> int:
+        with self.cond:
+            return len(self.heap) - self.cancelled
+
+    def _push(self, handle: TimerHandle):
+        with self.cond:
+            self._push_locked(handle)
+
+    def _push_locked(self, handle: TimerHandle):
+        heapq.heappush(self.heap, (handle.due, next(self.sequence), handle))
+        handle.queued = True
+        if self.heap[0][2] is handle:
+            self.cond.notify()
+
+    def _run(self):
+        while True:
+            with self.cond:
+                while True:
+                    if not self.heap:
+                        self.cond.wait()
+                        continue
+                    due, _, handle = self.heap[0]
+                    if handle.cancelled:
+                        heapq.heappop(self.heap)
+                        handle.queued = False
+                        self.cancelled -= 1
+                        continue
+                    wait = due - time.monotonic()
+                    if wait > 0:
+                        self.cond.wait(wait)
+                        continue
+                    heapq.heappop(self.heap)
+                    handle.queued = False
+                    break
+
+            try:
+                self.executor.submit(self._fire, handle)
+            except RuntimeError:
+                return
+
+    def _fire(self, handle: TimerHandle):
+        if handle.cancelled:
+            return
+        try:
+            handle.callback(*handle.args)
+        except Exception:
+            logger.exception(f"Erro em tarefa agendada {getattr(handle.callback, '__qualname__', handle.callback)}")
+
+        # Tarefas periódicas só voltam ao heap depois de terminar, então nunca rodam sobrepostas.
+        # A checagem e o rearme ficam sob o mesmo lock do cancel(), senão um cancel entre os dois
+        # não seria contado e o handle voltaria ao heap
+        if handle.interval is not None:
+            with self.cond:
+                if not handle.cancelled:
+                    handle.due = max(handle.due + handle.interval, time.monotonic())
+                    self._push_locked(handle)
+
+
+class _LoopTimer(TimerHandle):
+    __slots__ = ("loop_handle", "task")
+
+    def __init__(self, due: float, callback: Callable, args: tuple, interval: Optional[float]):
+        super().__init__(due, callback, args, interval)
+        self.loop_handle = None
+        self.task = None
+
+
+class AsyncioScheduler:
+    def __init__(self, loop: asyncio.AbstractEventLoop, executor: concurrent.futures.Executor = None):
+        self.loop = loop
+        # Callbacks síncronos (que fazem chamadas Pyro bloqueantes) vão para o executor; corrotinas rodam no loop
+        self.executor = executor
+        self.handles = set()
+        self.lock = threading.Lock()
+
+    def call_later(self, delay: float, callback: Callable, *args) -> TimerHandle:
+        handle = _LoopTimer(time.monotonic() + max(0.0, delay), callback, args, None)
+        self._push(handle)
+        return handle
+
+    def call_every(self, interval: float, callback: Callable, *args, first_delay: float = None) -> TimerHandle:
+        delay = interval if first_delay is None else first_delay
+        handle = _LoopTimer(time.monotonic() + max(0.0, delay), callback, args, interval)
+        self._push(handle)
+        return handle
+
+    def reschedule(self, handle: Optional[TimerHandle], delay: float, callback: Callable, *args) -> TimerHandle:
+        if handle is not None:
+            self.cancel(handle)
+        return self.call_later(delay, callback, *args)
+
+    def cancel(self, handle: TimerHandle):
+        if handle.cancelled:
+            return
+        handle.cancel()
+        with self.lock:
+            self.handles.discard(handle)
+        self._on_loop(self._disarm, handle)
+
+    def pending(self) -> int:
+        with self.lock:
+            return len(self.handles)
+
+    def _on_loop(self, callback: Callable, *args):
+        try:
+            running = asyncio.get_running_loop()
+        except RuntimeError:
+            running = None
+
+        if running is self.loop:
+            callback(*args)
+        elif not self.loop.is_closed():
+            self.loop.call_soon_threadsafe(callback, *args)
+
+    def _push(self, handle: _LoopTimer):
+        with self.lock:
+            self.handles.add(handle)
+        self._on_loop(self._arm, handle)
+
+    def _arm(self, handle: _LoopTimer):
+        if handle.cancelled:
+            return
+        # loop.time() usa o mesmo relógio monotônico do time.monotonic() nos loops padrão
+        delay = handle.due - time.monotonic()
+        handle.loop_handle = self.loop.call_at(self.loop.time() + max(0.0, delay), self._fire, handle)
+
+    def _disarm(self, handle: _LoopTimer):
+        if handle.loop_handle is not None:
+            handle.loop_handle.cancel()
+        if handle.task is not None:
+            handle.task.cancel()
+
+    def _fire(self, handle: _LoopTimer):
+        handle.loop_handle = None
+        if handle.cancelled:
+            return
+
+        if inspect.iscoroutinefunction(handle.callback):
+            handle.task = self.loop.create_task(handle.callback(*handle.args))
+        else:
+            try:
+                handle.task = self.loop.run_in_executor(self.executor, functools.partial(handle.callback, *handle.args))
+            except RuntimeError:
+                return
+        handle.task.add_done_callback(functools.partial(self._done, handle))
+
+    def _done(self, handle: _LoopTimer, task: asyncio.Future):
+        handle.task = None
+        if not task.cancelled() and task.exception() is not None:
+            error = task.exception()
+            logger.error(f"Erro em tarefa agendada {getattr(handle.callback, '__qualname__', handle.callback)}",
+                         exc_info=(type(error), error, error.__traceback__))
+
+        if handle.interval is not None and not handle.cancelled:
+            handle.due = max(handle.due + handle.interval, time.monotonic())
+            self._arm(handle)
+        elif handle.interval is None:
+            with self.lock:
+                self.handles.discard(handle)
+
+
+_default = None
+_default_lock = threading.Lock()
+
+
+def default_scheduler() -> Scheduler:
+    global _default
+    with _default_lock:
+        if _default is None:
+            _default = Scheduler()
+        return _default
@@ -0,0 +1,402 @@
+import re
+import uuid
+import bisect
+import contextlib
+import fnmatch
+import threading
+import collections
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+
+INDEX_LOG_SIZE = 10000
+
+INDEX_BULK_THRESHOLD = 64
+
+NGRAM_SIZE = 3
+QUERY_MODES = ("exact", "prefix", "glob", "substring")
+QUERY_MAX_LIMIT = 500
+
+
+def _ngrams(text: str) -> Set[str]:
+    return {text[i:i + NGRAM_SIZE] for i in range(len(text) - NGRAM_SIZE + 1)}
+
+
+class FileIndex:
+    def __init__(self):
+        self.lock = threading.RLock()
+        self.by_peer: Dict[int, Set[str]] = {}
+        self.holders: Dict[str, Set[int]] = {}
+        self.versions: Dict[int, Tuple[str, int]] = {}
+
+        self.index_id = uuid.uuid4().hex
+        self.version = 0
+        self.parent: Optional[Tuple[str, int]] = None
+        self.entries = 0
+        self.log = collections.deque(maxlen=INDEX_LOG_SIZE)
+
+        self.sorted_names: List[str] = []
+        self.ngram_index: Dict[str, Set[str]] = {}
+        self.pending_names: Optional[Tuple[List[str], Set[str]]] = None
+
+        self.meta: Dict[Tuple[int, str], Tuple[str, int]] = {}
+        self.by_hash: Dict[str, Set[Tuple[int, str]]] = {}
+
+    def _link(self, peer_id: int, filename: str, record: bool = True):
+        files = self.by_peer.setdefault(peer_id, set())
+        if filename in files:
+            return
+        files.add(filename)
+        if filename not in self.holders:
+            self.holders[filename] = set()
+            self._index_name(filename)
+        self.holders[filename].add(peer_id)
+        self.entries += 1
+        if record:
+            self._record("+", peer_id, filename)
+
+    def _unlink(self, peer_id: int, filename: str, record: bool = True):
+        files = self.by_peer.get(peer_id)
+        if files is None or filename not in files:
+            return
+        files.discard(filename)
+        self._clear_meta(peer_id, filename)
+        holders = self.holders.get(filename)
+        if holders is not None:
+            holders.discard(peer_id)
+            if not holders:
+                del self.holders[filename]
+                self._unindex_name(filename)
+        self.entries -= 1
+        if record:
+            self._record("-", peer_id, filename)
+
+    def _record(self, op: str, *args):
+        self.version += 1
+        self.log.append((self.version, op, args))
+
+    def _set_meta(self, peer_id: int, filename: str, digest: str, size: int, record: bool = True):
+        key = (peer_id, filename)
+        previous = self.meta.get(key)
+        if previous == (digest, size):
+            return
+        if previous is None or previous[0] != digest:
+            self._clear_meta(peer_id, filename)
+            self.by_hash.setdefault(digest, set()).add(key)
+        self.meta[key] = (digest, size)
+        if record:
+            self._record("m", peer_id, filename, digest, size)
+
+    def _set_version(self, peer_id: int, incarnation: Optional[str], version: Optional[int], record: bool = True):
+        current = self.versions.get(peer_id)
+        target = (incarnation, version) if incarnation is not None and version is not None else None
+        if current == target:
+            return
+        if target is None:
+            del self.versions[peer_id]
+        else:
+            self.versions[peer_id] = target
+        if record:
+            self._record("v", peer_id, incarnation, version)
+
+    def _clear_meta(self, peer_id: int, filename: str):
+        key = (peer_id, filename)
+        previous = self.meta.pop(key, None)
+        if previous is None:
+            return
+        keys = self.by_hash.get(previous[0])
+        if keys is not None:
+            keys.discard(key)
+            if not keys:
+                del self.by_hash[previous[0]]
+
+    def _apply_metadata(self, peer_id: int, metadata: Dict[str, list]):
+        for filename, (digest, size) in (metadata or {}).items():
+            if filename in self.by_peer.get(peer_id, ()):
+                self._set_meta(peer_id, filename, digest, size)
+
+    @contextlib.contextmanager
+    def _bulk_names(self):
+        # Registros grandes fundem os nomes novos de uma vez em vez de um insort por arquivo sob o lock
+        if self.pending_names is not None:
+            yield
+            return
+        self.pending_names = ([], set())
+        try:
+            yield
+        finally:
+            added, removed = self.pending_names
+            self.pending_names = None
+            self._merge_names(added, removed)
+
+    def _merge_names(self, added: List[str], removed: Set[str]):
+        added = [filename for filename in added if filename not in removed]
+        if len(added) + len(removed) < INDEX_BULK_THRESHOLD:
+            for filename in removed:
+                self._unindex_name(filename)
+            for filename in added:
+                self._index_name(filename)
+            return
+
+        if removed:
+            self.sorted_names = [filename for filename in self.sorted_names if filename not in removed]
+            for filename in removed:
+                self._unindex_grams(filename)
+        if added:
+            # O timsort reconhece as duas sequências já ordenadas e só as intercala
+            self.sorted_names.extend(sorted(added))
+            self.sorted_names.sort()
+            grams: Dict[str, List[str]] = collections.defaultdict(list)
+            for filename in added:
+                for gram in _ngrams(filename.lower()):
+                    grams[gram].append(filename)
+            for gram, names in grams.items():
+                self.ngram_index.setdefault(gram, set()).update(names)
+
+    def _index_name(self, filename: str):
+        if self.pending_names is not None:
+            added, removed = self.pending_names
+            if filename in removed:
+                removed.discard(filename)
+            else:
+                added.append(filename)
+            return
+        bisect.insort(self.sorted_names, filename)
+        for gram in _ngrams(filename.lower()):
+            self.ngram_index.setdefault(gram, set()).add(filename)
+
+    def _unindex_name(self, filename: str):
+        if self.pending_names is not None:
+            self.pending_names[1].add(filename)
+            return
+        position = bisect.bisect_left(self.sorted_names, filename)
+        if position < len(self.sorted_names) and self.sorted_names[position] == filename:
+            del self.sorted_names[position]
+        self._unindex_grams(filename)
+
+    def _unindex_grams(self, filename: str):
+        for gram in _ngrams(filename.lower()):
+            names = self.ngram_index.get(gram)
+            if names is not None:
+                names.discard(filename)
+                if not names:
+                    del self.ngram_index[gram]
+
+    def _prefix_range(self, prefix: str) -> List[str]:
+        start = bisect.bisect_left(self.sorted_names, prefix)
+        end = bisect.bisect_right(self.sorted_names, prefix + chr(0x10FFFF), start)
+        return self.sorted_names[start:end]
+
+    def _ngram_candidates(self, text: str):
+        grams = _ngrams(text.lower())
+        if not grams:
+            return None
+        sets = sorted((self.ngram_index.get(gram, set()) for gram in grams), key=len)
+        return set.intersection(*sets) if sets[0] else set()
+
+    def _match(self, pattern: str, mode: str) -> List[str]:
+        if mode == "exact":
+            return [pattern] if pattern in self.holders else []
+
+        if mode == "prefix":
+            return self._prefix_range(pattern)
+
+        if mode == "substring":
+            needle = pattern.lower()
+            candidates = self._ngram_candidates(needle)
+            names = self.sorted_names if candidates is None else sorted(candidates)
+            return [name for name in names if needle in name.lower()]
+
+        literal_prefix = pattern
+        for position, char in enumerate(pattern):
+            if char in "*?[":
+                literal_prefix = pattern[:position]
+                break
+
+        if literal_prefix:
+            names = self._prefix_range(literal_prefix)
+        else:
+            literals = [part for part in re.split(r"\[[^\]]*\]|[*?]", pattern) if len(part) >= NGRAM_SIZE]
+            candidates = self._ngram_candidates(max(literals, key=len)) if literals else None
+            names = self.sorted_names if candidates is None else sorted(candidates)
+        return [name for name in names if fnmatch.fnmatchcase(name, pattern)]
+
+    def query(self, pattern: str, mode: str = "exact", offset: int = 0, limit: int = 100) -> Dict:
+        if mode not in QUERY_MODES:
+            raise ValueError(f"Modo de busca inválido: {mode}")
+
+        offset = max(0, offset)
+        limit = max(0, min(limit, QUERY_MAX_LIMIT))
+
+        with self.lock:
+            names = self._match(pattern, mode)
+            page = [[name, sorted(self.holders[name])] for name in names[offset:offset + limit]]
+            return {"total": len(names), "offset": offset, "results": page}
+
+    def set_peer_files(self, peer_id: int, files: Iterable[str], incarnation: str = None, version: int = None,
+                       metadata: Dict[str, list] = None):
+        files = set(files)
+        with self.lock, self._bulk_names():
+            current = self.by_peer.get(peer_id, set())
+            for filename in current - files:
+                self._unlink(peer_id, filename)
+            for filename in files - current:
+                self._link(peer_id, filename)
+            self.by_peer.setdefault(peer_id, set())
+            self._apply_metadata(peer_id, metadata)
+            self._set_version(peer_id, incarnation, version)
+
+    def apply_delta(self, peer_id: int, incarnation: str, base_version: int, version: int,
+                    added: Iterable[str], removed: Iterable[str], metadata: Dict[str, list] = None) -> bool:
+        with self.lock, self._bulk_names():
+            if self.versions.get(peer_id) != (incarnation, base_version):
+                return False
+
+            for filename in removed:
+                self._unlink(peer_id, filename)
+            for filename in added:
+                self._link(peer_id, filename)
+            self._apply_metadata(peer_id, metadata)
+            self._set_version(peer_id, incarnation, version)
+            return True
+
+    def add(self, peer_id: int, filename: str, metadata: Dict[str, list] = None):
+        with self.lock:
+            self._link(peer_id, filename)
+            self._apply_metadata(peer_id, metadata)
+
+    def remove(self, peer_id: int, filename: str):
+        with self.lock:
+            self.by_peer.setdefault(peer_id, set())
+            self._unlink(peer_id, filename)
+
+    def drop_peer(self, peer_id: int):
+        with self.lock, self._bulk_names():
+            for filename in list(self.by_peer.get(peer_id, ())):
+                self._unlink(peer_id, filename)
+            self.by_peer.pop(peer_id, None)
+            self._set_version(peer_id, None, None)
+
+    def holders_of(self, filename: str) -> List[int]:
+        with self.lock:
+            return list(self.holders.get(filename, ()))
+
+    def holders_of_hash(self, digest: str) -> List[List]:
+        with self.lock:
+            return [[peer_id, filename] for peer_id, filename in sorted(self.by_hash.get(digest, ()))]
+
+    def locate(self, filename: str) -> Dict:
+        with self.lock:
+            holders = self.holders.get(filename, set())
+            digests = collections.Counter(self.meta[(peer_id, filename)] for peer_id in holders if (peer_id, filename) in self.meta)
+
+            if not digests:
+                return {"hash": None, "size": None, "sources": [[peer_id, filename] for peer_id in sorted(holders)]}
+
+            (digest, size), _ = digests.most_common(1)[0]
+            return {"hash": digest, "size": size, "sources": self.holders_of_hash(digest)}
+
+    def position(self) -> Tuple[str, int]:
+        with self.lock:
+            return self.index_id, self.version
+
+    def snapshot(self) -> Dict[int, List[str]]:
+        with self.lock:
+            return {peer_id: list(files) for peer_id, files in self.by_peer.items()}
+
+    def changes_since(self, version: int, index_id: str = None, max_changes: int = None) -> Optional[Dict]:
+        with self.lock:
+            if index_id == self.index_id and version == self.version:
+                return None
+
+            # Réplicas paradas exatamente onde esta linhagem começou seguem recebendo diffs
+            since_id = index_id
+            if self.parent is not None and (index_id, version) == self.parent:
+                index_id = self.index_id
+
+            oldest = self.log[0][0] if self.log else self.version + 1
+            if index_id != self.index_id or version > self.version or oldest > version + 1:
+                if max_changes is not None:
+                    return None
+                return {
+                    "index_id": self.index_id,
+                    "version": self.version,
+                    "full": True,
+                    "index": self.snapshot(),
+                    "meta": [[peer_id, filename, digest, size] for (peer_id, filename), (digest, size) in self.meta.items()],
+                    "versions": {peer_id: list(value) for peer_id, value in self.versions.items()},
+                }
+
+            if max_changes is not None and self.version - version > max_changes:
+                return None
+
+            changes = [[op, *args] for v, op, args in self.log if v > version]
+            return {
+                "index_id": self.index_id,
+                "since_id": since_id,
+                "since": version,
+                "version": self.version,
+                "full": False,
+                "changes": changes,
+            }
+
+    def apply_changes(self, changes: Dict) -> bool:
+        with self.lock, self._bulk_names():
+            if changes["full"]:
+                self.by_peer = {}
+                self.holders = {}
+                self.sorted_names = []
+                self.ngram_index = {}
+                self.meta = {}
+                self.by_hash = {}
+                self.versions = {}
+                self.entries = 0
+                for peer_id, files in changes["index"].items():
+                    self.by_peer.setdefault(int(peer_id), set())
+                    for filename in files:
+                        self._link(int(peer_id), filename, record=False)
+                for peer_id, filename, digest, size in changes.get("meta", ()):
+                    self._set_meta(int(peer_id), filename, digest, size, record=False)
+                for peer_id, (incarnation, version) in changes.get("versions", {}).items():
+                    self.versions[int(peer_id)] = (incarnation, version)
+            else:
+                # Reaplicar um trecho já visto é inofensivo (a última operação de cada chave vence), mas um buraco não
+                since_id = changes.get("since_id", changes["index_id"])
+                if since_id != self.index_id or changes.get("since", self.version) > self.version:
+                    return False
+                # Vindo de outra linhagem, só a posição exata em que ela se ramificou é um ponto de partida comum
+                if since_id != changes["index_id"] and changes["since"] != self.version:
+                    return False
+
+                for op, peer_id, *args in changes["changes"]:
+                    peer_id = int(peer_id)
+                    if op == "+":
+                        self._link(peer_id, args[0], record=False)
+                    elif op == "-":
+                        self._unlink(peer_id, args[0], record=False)
+                    elif op == "m":
+                        self._set_meta(peer_id, *args, record=False)
+                    elif op == "v":
+                        self._set_version(peer_id, *args, record=False)
+
+            self.log.clear()
+            self.index_id = changes["index_id"]
+            self.version = max(self.version, changes["version"]) if not changes["full"] else changes["version"]
+            return True
+
+    def fork(self):
+        # Nova linhagem a partir da posição atual, sem copiar o índice: réplicas em outras posições recebem um
+        # snapshot completo em vez de diffs ambíguos, e as que estão nesta mesma posição continuam com diffs
+        with self.lock:
+            self.parent = (self.index_id, self.version)
+            self.index_id = uuid.uuid4().hex
+            self.log.clear()
+
+    def stats(self) -> Dict:
+        with self.lock:
+            return {
+                "index_id": self.index_id,
+                "version": self.version,
+                "peers": len(self.by_peer),
+                "files": self.entries,
+                "unique_files": len(self.holders),
+                "unique_contents": len(self.by_hash),
+            }
@@ -0,0 +1,177 @@
+import os
+import sys
+import time
+import errno
+import ctypes
+import struct
+import select
+import logging
+import threading
+from typing import Callable, Dict, Optional, Set, Tuple
+
+POLL_INTERVAL = 2.0
+DEBOUNCE_INTERVAL = 0.2
+
+IN_CLOSE_WRITE = 0x00000008
+IN_MOVED_FROM = 0x00000040
+IN_MOVED_TO = 0x00000080
+IN_DELETE = 0x00000200
+IN_DELETE_SELF = 0x00000400
+IN_MOVE_SELF = 0x00000800
+IN_Q_OVERFLOW = 0x00004000
+IN_IGNORED = 0x00008000
+IN_ISDIR = 0x40000000
+IN_NONBLOCK = os.O_NONBLOCK
+IN_CLOEXEC = getattr(os, "O_CLOEXEC", 0)
+
+INOTIFY_MASK = IN_CLOSE_WRITE | IN_MOVED_TO | IN_MOVED_FROM | IN_DELETE | IN_DELETE_SELF | IN_MOVE_SELF
+EVENT_HEADER = struct.Struct("iIII")
+
+# on_change(alterados, removidos); on_rescan() quando os eventos se perdem e só uma varredura completa resolve
+ChangeCallback = Callable[[Set[str], Set[str]], None]
+
+
+def _load_libc():
+    if not sys.platform.startswith("linux"):
+        return None
+    try:
+        libc = ctypes.CDLL(None, use_errno=True)
+        libc.inotify_init1
+        libc.inotify_add_watch
+        return libc
+    except (OSError, AttributeError):
+        return None
+
+
+class FileWatcher:
+    def __init__(self, path: str, logger: logging.Logger, on_change: ChangeCallback,
+                 on_rescan: Callable[[], None], ignore: Callable[[str], bool] = lambda name: False):
+        self.path = path
+        self.logger = logger
+        self.on_change = on_change
+        self.on_rescan = on_rescan
+        self.ignore = ignore
+        self.stop_event = threading.Event()
+        self.backend = None
+        self.fd = None
+        self.thread = None
+
+    def start(self):
+        libc = _load_libc()
+        if libc is not None:
+            try:
+                self.fd = self._inotify_open(libc)
+                self.backend = "inotify"
+            except OSError as e:
+                self.logger.warning(f"inotify indisponível, usando varredura periódica: {e}")
+
+        if self.backend is None:
+            self.backend = "polling"
+
+        target = self._inotify_loop if self.backend == "inotify" else self._polling_loop
+        self.thread = threading.Thread(target=target, daemon=True, name=f"{self.logger.name}-watcher")
+        self.thread.start()
+        self.logger.info(f"Monitorando {self.path} via {self.backend}")
+
+    def stop(self):
+        self.stop_event.set()
+        if self.thread is not None and self.thread is not threading.current_thread():
+            self.thread.join(timeout=POLL_INTERVAL + 1)
+        if self.fd is not None:
+            os.close(self.fd)
+            self.fd = None
+
+    def _inotify_open(self, libc) -> int:
+        fd = libc.inotify_init1(IN_NONBLOCK | IN_CLOEXEC)
+        if fd < 0:
+            raise OSError(ctypes.get_errno(), os.strerror(ctypes.get_errno()))
+
+        if libc.inotify_add_watch(fd, os.fsencode(self.path), INOTIFY_MASK) < 0:
+            error = ctypes.get_errno()
+            os.close(fd)
+            raise OSError(error, os.strerror(error))
+        return fd
+
+    def _inotify_loop(self):
+        changed: Set[str] = set()
+        removed: Set[str] = set()
+        deadline = None
+
+        while not self.stop_event.is_set():
+            timeout = 0.5 if deadline is None else max(0.0, deadline - time.monotonic())
+            ready, _, _ = select.select([self.fd], [], [], timeout)
+
+            if ready:
+                try:
+                    data = os.read(self.fd, 64 * 1024)
+                except OSError as e:
+                    if e.errno in (errno.EAGAIN, errno.EINTR):
+                        continue
+                    raise
+
+                for mask, name in self._parse_events(data):
+                    if mask & IN_Q_OVERFLOW:
+                        self.logger.warning("Fila do inotify estourou, varrendo o diretório")
+                        changed.clear()
+                        removed.clear()
+                        self._safe_call(self.on_rescan)
+                    elif mask & (IN_DELETE_SELF | IN_MOVE_SELF | IN_IGNORED):
+                        self.logger.error(f"Diretório {self.path} removido ou movido, monitoramento encerrado")
+                        return
+                    elif not name or mask & IN_ISDIR or self.ignore(name):
+                        continue
+                    elif mask & (IN_CLOSE_WRITE | IN_MOVED_TO):
+                        changed.add(name)
+                        removed.discard(name)
+                    elif mask & (IN_DELETE | IN_MOVED_FROM):
+                        removed.add(name)
+                        changed.discard(name)
+
+                # Agrupa rajadas de eventos (cópia de muitos arquivos) num único delta
+                if (changed or removed) and deadline is None:
+                    deadline = time.monotonic() + DEBOUNCE_INTERVAL
+
+            if deadline is not None and time.monotonic() >= deadline:
+                self._safe_call(self.on_change, changed, removed)
+                changed, removed = set(), set()
+                deadline = None
+
+    def _parse_events(self, data: bytes):
+        offset = 0
+        while offset + EVENT_HEADER.size <= len(data):
+            _, mask, _, length = EVENT_HEADER.unpack_from(data, offset)
+            offset += EVENT_HEADER.size
+            name = data[offset:offset + length].rstrip(b"\0")
+            offset += length
+            yield mask, os.fsdecode(name)
+
+    def _snapshot(self) -> Dict[str, Tuple[int, int]]:
+        snapshot = {}
+        for entry in os.scandir(self.path):
+            if entry.is_file() and not self.ignore(entry.name):
+                stat = entry.stat()
+                snapshot[entry.name] = (stat.st_size, stat.st_mtime_ns)
+        return snapshot
+
+    def _polling_loop(self):
+        previous: Optional[Dict[str, Tuple[int, int]]] = None
+
+        while not self.stop_event.is_set():
+            try:
+                current = self._snapshot()
+                if previous is not None:
+                    changed = {name for name, stamp in current.items() if previous.get(name) != stamp}
+                    removed = set(previous) - set(current)
+                    if changed or removed:
+                        self._safe_call(self.on_change, changed, removed)
+                previous = current
+            except Exception as e:
+                self.logger.error(f"Erro ao varrer {self.path}: {e}")
+
+            self.stop_event.wait(POLL_INTERVAL)
+
+    def _safe_call(self, callback, *args):
+        try:
+            callback(*args)
+        except Exception as e:
+            self.logger.error(f"Erro ao processar mudanças em {self.path}: {e}")